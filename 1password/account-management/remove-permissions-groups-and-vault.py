@@ -1,15 +1,36 @@
-import subprocess
+import argparse
+import asyncio
 import csv
 import threading
 import sys
 import os
-import queue
-import time
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Tuple, Dict
 from tqdm import tqdm
 
+# YAML desired-state files are optional; CSV works without PyYAML
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+# Shared CLI/SDK session layer, one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from op_session import AdaptiveLimiter, OpSession
+
+# Upper bound on concurrent 1Password CLI calls; override with --max-workers
+DEFAULT_MAX_WORKERS = 8
+max_workers = DEFAULT_MAX_WORKERS
+
+# One 1Password session shared by every CLI call in this run. Concurrency
+# adapts to latency and halves when a call is rate limited; main() attaches
+# the limiter once --max-workers is known.
+session = OpSession()
+
 # Colors for console output
 CYAN = "\033[96m"
 YELLOW = "\033[93m"
@@ -126,176 +147,267 @@ PERMISSION_MAPPINGS = {
     }
 }
 
-# Queue for handling vault processing tasks
-process_queue = queue.Queue()
-process_thread_running = threading.Event()
-results_lock = threading.Lock()
+# One bit per permission name, in the order permissions are reported
+PERMISSION_ORDER = [
+    "allow_viewing", "allow_editing", "allow_managing",
+    "view_items", "view_and_copy_passwords", "view_item_history",
+    "create_items", "edit_items", "archive_items", "delete_items",
+    "import_items", "export_items", "copy_and_share_items", "print_items",
+    "manage_vault"
+]
+PERMISSION_BITS = {perm: 1 << i for i, perm in enumerate(PERMISSION_ORDER)}
+
+def _closure_mask(perm: str, visiting: Tuple[str, ...] = ()) -> int:
+    # Mask of perm plus everything that must be revoked with it, followed transitively
+    mapping = PERMISSION_MAPPINGS.get(perm, {})
+    mask = PERMISSION_BITS[perm]
+    for dependent in mapping.get("additional_perms", []) + mapping.get("prompt_depends", []):
+        if dependent not in visiting:
+            mask |= _closure_mask(dependent, visiting + (perm,))
+    return mask
+
+# Precomputed revocation closure for every permission
+PERMISSION_CLOSURE = {perm: _closure_mask(perm) for perm in PERMISSION_ORDER}
+
+@lru_cache(maxsize=None)
+def revocation_mask(permissions: Tuple[str, ...]) -> int:
+    # Effective revocation for a set of selected permissions
+    mask = 0
+    for perm in permissions:
+        mask |= PERMISSION_CLOSURE[perm]
+    return mask
+
+@lru_cache(maxsize=None)
+def permissions_for_mask(mask: int) -> Tuple[str, ...]:
+    return tuple(perm for perm in PERMISSION_ORDER if mask & PERMISSION_BITS[perm])
+
+# 1Password SDK vault permission bits for each CLI permission name. The SDK
+# is only needed for --sdk, so the table is empty when it isn't installed.
+try:
+    from onepassword import (
+        ARCHIVE_ITEMS,
+        CREATE_ITEMS,
+        DELETE_ITEMS,
+        EXPORT_ITEMS,
+        IMPORT_ITEMS,
+        MANAGE_VAULT,
+        PRINT_ITEMS,
+        READ_ITEMS,
+        REVEAL_ITEM_PASSWORD,
+        SEND_ITEMS,
+        UPDATE_ITEM_HISTORY,
+        UPDATE_ITEMS,
+    )
+    SDK_PERMISSION_BITS = {
+        "view_items": READ_ITEMS,
+        "view_and_copy_passwords": REVEAL_ITEM_PASSWORD,
+        "view_item_history": UPDATE_ITEM_HISTORY,
+        "create_items": CREATE_ITEMS,
+        "edit_items": UPDATE_ITEMS,
+        "archive_items": ARCHIVE_ITEMS,
+        "delete_items": DELETE_ITEMS,
+        "import_items": IMPORT_ITEMS,
+        "export_items": EXPORT_ITEMS,
+        "copy_and_share_items": SEND_ITEMS,
+        "print_items": PRINT_ITEMS,
+        "manage_vault": MANAGE_VAULT,
+        "allow_viewing": READ_ITEMS | REVEAL_ITEM_PASSWORD | UPDATE_ITEM_HISTORY,
+        "allow_editing": CREATE_ITEMS | UPDATE_ITEMS | ARCHIVE_ITEMS | DELETE_ITEMS | IMPORT_ITEMS | EXPORT_ITEMS | SEND_ITEMS | PRINT_ITEMS,
+        "allow_managing": MANAGE_VAULT,
+    }
+except ImportError:
+    SDK_PERMISSION_BITS = {}
+# Number of group permission updates sent per SDK update_group_permissions call
+SDK_BATCH_SIZE = 100
+
+@lru_cache(maxsize=None)
+def sdk_mask(mask: int) -> int:
+    # Convert a closure mask to SDK permission bits
+    sdk_bits = 0
+    for perm in permissions_for_mask(mask):
+        sdk_bits |= SDK_PERMISSION_BITS[perm]
+    return sdk_bits
 
-def process_vaults(permissions: List[str], vault_names: Dict[str, Dict[str, str]], group_names: Dict[str, str], csv_writer: csv.DictWriter, failure_count: List[int]) -> None:
-    # Process vault-group pairs: revoke permissions, update failure count
-    semaphore = threading.Semaphore(7)
-    while process_thread_running.is_set():
-        try:
-            vault_id, group_id, lock = process_queue.get_nowait()
-            with semaphore:
-                # Handle each permission
-                revoke_perms = []
-                additional_perms = []
-                requires_prompt = False
-                prompt_depends = []
-
-                # Build revoke permissions based on mappings
-                for perm in permissions:
-                    if perm in PERMISSION_MAPPINGS:
-                        mapping = PERMISSION_MAPPINGS[perm]
-                        revoke_perms.append(perm)
-                        revoke_perms.extend(mapping["additional_perms"])
-                        additional_perms.append(perm)
-                        additional_perms.extend(mapping["additional_perms"])
-                        if mapping["requires_prompt"]:
-                            requires_prompt = True
-                            prompt_depends.extend(mapping.get("prompt_depends", []))
-                        revoke_perms.extend(prompt_depends)
-                    else:
-                        revoke_perms.append(perm)
-                        additional_perms.append(perm)
-
-                        # Remove duplicates while preserving order
-                        revoke_perms = list(dict.fromkeys(revoke_perms))
-                        additional_perms = list(dict.fromkeys(additional_perms))
-
-                # Check if revoke_perms is empty
-                if not revoke_perms:
-                    status = "Skipped"
-                    error_msg = "No valid permissions to revoke"
-                    with lock:
-                        csv_writer.writerow({
-                            "Timestamp": datetime.now().isoformat(),
-                            "Vault_ID": vault_id,
-                            "Vault_Name": vault_names.get(group_id, {}).get(vault_id, vault_id),
-                            "Group_ID": group_id,
-                            "Group_Name": group_names.get(group_id, group_id),
-                            "Status": status,
-                            "Error": error_msg
-                        })
-                    process_queue.task_done()
-                    continue
+results_lock = threading.Lock()
 
-                # Execute the revoke command
-                cmd = ["vault", "group", "revoke", "--vault", vault_id, "--group", group_id, "--permissions", ",".join(revoke_perms)]
-                status = "Success"
-                error_msg = ""
-
-                if requires_prompt:
-                    # Use subprocess.Popen for interactive prompt
-                    process = subprocess.Popen(
-                        ["op"] + cmd,
-                        stdin=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        bufsize=1,
-                        env=dict(os.environ, PYTHONUNBUFFERED="1")
-                    )
-                    output = []
-                    prompt_detected = False
-                    prompt_perms = ""
-                    start_time = time.time()
-                    while process.poll() is None and time.time() - start_time < 10:
-                        try:
-                            line = process.stdout.readline().strip()
-                            if line:
-                                output.append(line)
-                                if "In order to remove" in line and "[Y/n]" in line:
-                                    prompt_detected = True
-                                    start = line.find("the permission(s) [") + 18
-                                    end = line.find("]", start)
-                                    prompt_perms = line[start:end]
-                                    process.stdin.write("Y\n")
-                                    process.stdin.flush()
-                                    break
-                            line = process.stderr.readline().strip()
-                            if line:
-                                output.append(line)
-                        except IOError:
-                            time.sleep(0.1)
-                    if not prompt_detected:
-                        stdout, stderr = process.communicate(timeout=5)
-                        output.extend(stdout.splitlines())
-                        output.extend(stderr.splitlines())
-
-                    return_code = process.poll() or process.returncode
+def revoke_pair(vault_id: str, group_id: str, permissions: List[str], vault_names: Dict[str, Dict[str, str]], group_names: Dict[str, str], csv_writer: csv.DictWriter, lock: threading.Lock, failure_count: List[int]) -> None:
+    # Revoke permissions for one vault-group pair, log the outcome and update the failure count
+    try:
+        # Effective revocation is a lookup in the precomputed closure table
+        revoke_mask = revocation_mask(tuple(permissions))
+        revoke_perms = list(permissions_for_mask(revoke_mask))
+
+        # Check if revoke_perms is empty
+        if not revoke_perms:
+            status = "Skipped"
+            error_msg = "No valid permissions to revoke"
+            with lock:
+                csv_writer.writerow({
+                    "Timestamp": datetime.now().isoformat(),
+                    "Vault_ID": vault_id,
+                    "Vault_Name": vault_names.get(group_id, {}).get(vault_id, vault_id),
+                    "Group_ID": group_id,
+                    "Group_Name": group_names.get(group_id, group_id),
+                    "Status": status,
+                    "Error": error_msg
+                })
+            return
+
+        # Execute the revoke command
+        cmd = ["vault", "group", "revoke", "--vault", vault_id, "--group", group_id, "--permissions", ",".join(revoke_perms), "--no-input"]
+        status = "Success"
+        error_msg = ""
+
+        # The closure already includes every dependent permission, so the CLI has
+        # nothing to ask about and the revoke can run without a terminal
+        result = session.run(cmd)
+        output = (result.stdout + result.stderr).splitlines()
+        return_code = result.returncode
+
+        if return_code == 0:
+            status = "Success"
+            if revoke_perms:
+                if "view_items" in permissions or "allow_viewing" in permissions:
+                    error_msg = "Removed all permissions except manage_vault"
                 else:
-                    # Non-interactive command
-                    result = subprocess.run(
-                        ["op"] + cmd,
-                        capture_output=True,
-                        text=True,
-                        env=dict(os.environ, PYTHONUNBUFFERED="1")
-                    )
-                    output = (result.stdout + result.stderr).splitlines()
-                    return_code = result.returncode
-
-                if return_code == 0:
+                    error_msg = f"Removed permissions: {','.join(revoke_perms)}"
+        else:
+            # Parse error for dependencies as a fallback
+            error_text = "\n".join(output)
+            if "dependent on the permission(s)" in error_text:
+                start = error_text.find("dependent on the permission(s)") + 30
+                end = error_text.find("\n", start) or len(error_text)
+                dep_perms = error_text[start:end].split(", ")
+                new_perms = list(dict.fromkeys(revoke_perms + [p for p in dep_perms if p in VALID_PERMISSIONS and p not in revoke_perms]))
+                cmd = ["vault", "group", "revoke", "--vault", vault_id, "--group", group_id, "--permissions", ",".join(new_perms), "--no-input"]
+
+                result = session.run(cmd)
+                output = (result.stdout + result.stderr).splitlines()
+
+                if result.returncode == 0:
                     status = "Success"
-                    if additional_perms:
-                        if "view_items" in permissions or "allow_viewing" in permissions:
-                            error_msg = "Removed all permissions except manage_vault"
-                        else:
-                            error_msg = f"Removed permissions: {','.join(additional_perms)}"
-                else:
-                    # Parse error for dependencies as a fallback
-                    error_text = "\n".join(output)
-                    if "dependent on the permission(s)" in error_text:
-                        start = error_text.find("dependent on the permission(s)") + 30
-                        end = error_text.find("\n", start) or len(error_text)
-                        dep_perms = error_text[start:end].split(", ")
-                        new_perms = list(dict.fromkeys(revoke_perms + [p for p in dep_perms if p in VALID_PERMISSIONS and p not in revoke_perms]))
-                        cmd = ["vault", "group", "revoke", "--vault", vault_id, "--group", group_id, "--permissions", ",".join(new_perms)]
-
-                        result = subprocess.run(
-                            ["op"] + cmd,
-                            capture_output=True,
-                            text=True,
-                            env=dict(os.environ, PYTHONUNBUFFERED="1")
-                        )
-                        output = (result.stdout + result.stderr).splitlines()
-
-                        if result.returncode == 0:
-                            status = "Success"
-                            if "view_items" in permissions or "allow_viewing" in permissions:
-                                error_msg = "Removed all permissions except manage_vault"
-                            else:
-                                error_msg = f"Removed permissions including dependencies: {','.join(new_perms)}"
-                        else:
-                            status = "Failed"
-                            error_msg = "\n".join(output) or f"Unknown CLI error (command: {' '.join(['op'] + cmd)})"
-                            with results_lock:
-                                failure_count[0] += 1
+                    if "view_items" in permissions or "allow_viewing" in permissions:
+                        error_msg = "Removed all permissions except manage_vault"
                     else:
-                        status = "Failed"
-                        error_msg = "\n".join(output) or f"Unknown CLI error (command: {' '.join(['op'] + cmd)})"
-                        with results_lock:
-                            failure_count[0] += 1
-
-                with lock:
-                    csv_writer.writerow({
-                        "Timestamp": datetime.now().isoformat(),
-                        "Vault_ID": vault_id,
-                        "Vault_Name": vault_names.get(group_id, {}).get(vault_id, vault_id),
-                        "Group_ID": group_id,
-                        "Group_Name": group_names.get(group_id, group_id),
-                        "Status": status,
-                        "Error": error_msg
-                    })
-                process_queue.task_done()
-                time.sleep(0.3)
-        except queue.Empty:
-            time.sleep(0.1)
+                        error_msg = f"Removed permissions including dependencies: {','.join(new_perms)}"
+                else:
+                    status = "Failed"
+                    error_msg = "\n".join(output) or f"Unknown CLI error (command: {' '.join(['op'] + cmd)})"
+                    with results_lock:
+                        failure_count[0] += 1
+            else:
+                status = "Failed"
+                error_msg = "\n".join(output) or f"Unknown CLI error (command: {' '.join(['op'] + cmd)})"
+                with results_lock:
+                    failure_count[0] += 1
+
+        with lock:
+            csv_writer.writerow({
+                "Timestamp": datetime.now().isoformat(),
+                "Vault_ID": vault_id,
+                "Vault_Name": vault_names.get(group_id, {}).get(vault_id, vault_id),
+                "Group_ID": group_id,
+                "Group_Name": group_names.get(group_id, group_id),
+                "Status": status,
+                "Error": error_msg
+            })
+    except Exception as e:
+        print(f"{RED}⚠️ Error processing vault {vault_id}, group {group_id}: {e}{RESET}")
+        with results_lock:
+            failure_count[0] += 1
+
+def process_vaults(pairs: List[Tuple[str, str]], permissions: List[str], vault_names: Dict[str, Dict[str, str]], group_names: Dict[str, str], csv_writer: csv.DictWriter, lock: threading.Lock, failure_count: List[int]) -> None:
+    # Revoke permissions for every pair on a worker pool. At most twice the worker count
+    # is queued at once, so a large pair list doesn't pile up as pending futures.
+    in_flight = threading.BoundedSemaphore(max_workers * 2)
+    with tqdm(total=len(pairs), desc="Processing", unit="pair") as pbar, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def on_done(future) -> None:
+            in_flight.release()
+            pbar.update(1)
+
+        for vault_id, group_id in pairs:
+            in_flight.acquire()
+            future = executor.submit(revoke_pair, vault_id, group_id, permissions, vault_names, group_names, csv_writer, lock, failure_count)
+            future.add_done_callback(on_done)
+
+async def revoke_pairs_sdk_async(client, pairs: List[Tuple[str, str]], revoke_bits: int) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    # Read each group's current vault permissions once, clear the revoked bits and write
+    # the remaining permissions back in batches. Returns (status, message) per pair.
+    from onepassword import GroupGetParams, GroupVaultAccess
+
+    outcomes = {}
+
+    # Every SDK call goes through the session's adaptive limiter, which backs
+    # off and retries when 1Password rate limits a call, like the CLI path
+    async def current_permissions(group_id: str):
+        group = await session.limited(lambda: client.groups.get(group_id, GroupGetParams(vault_permissions=True)))
+        return {access.vault_uuid: access.permissions for access in group.vault_access or []}
+
+    group_ids = list(dict.fromkeys(group_id for _, group_id in pairs))
+    fetched = await asyncio.gather(*(current_permissions(group_id) for group_id in group_ids), return_exceptions=True)
+    current = dict(zip(group_ids, fetched))
+
+    updates = []
+    revokes = []
+    for vault_id, group_id in pairs:
+        group_access = current[group_id]
+        if isinstance(group_access, Exception):
+            outcomes[(vault_id, group_id)] = ("Failed", f"Failed to read group permissions: {group_access}")
+        elif vault_id not in group_access:
+            outcomes[(vault_id, group_id)] = ("Skipped", "Group no longer has access to this vault")
+        elif not group_access[vault_id] & revoke_bits:
+            outcomes[(vault_id, group_id)] = ("Skipped", "Group has none of the permissions to revoke")
+        elif group_access[vault_id] & ~revoke_bits:
+            updates.append(GroupVaultAccess(vault_id=vault_id, group_id=group_id, permissions=group_access[vault_id] & ~revoke_bits))
+        else:
+            revokes.append((vault_id, group_id))
+
+    async def update_batch(batch) -> None:
+        try:
+            await session.limited(lambda: client.vaults.update_group_permissions(batch))
+            result = ("Success", "")
         except Exception as e:
-            print(f"{RED}⚠️ Error processing vault {vault_id}, group {group_id}: {e}{RESET}")
-            with results_lock:
-                failure_count[0] += 1
+            result = ("Failed", str(e))
+        for access in batch:
+            outcomes[(access.vault_id, access.group_id)] = result
+
+    async def revoke_all(vault_id: str, group_id: str) -> None:
+        # Nothing would remain, so remove the group from the vault
+        try:
+            await session.limited(lambda: client.vaults.revoke_group_permissions(vault_id, group_id))
+            outcomes[(vault_id, group_id)] = ("Success", "")
+        except Exception as e:
+            outcomes[(vault_id, group_id)] = ("Failed", str(e))
+
+    await asyncio.gather(
+        *(update_batch(updates[start:start + SDK_BATCH_SIZE]) for start in range(0, len(updates), SDK_BATCH_SIZE)),
+        *(revoke_all(vault_id, group_id) for vault_id, group_id in revokes),
+    )
+    return outcomes
+
+def revoke_pairs_sdk(pairs: List[Tuple[str, str]], permissions: List[str], vault_names: Dict[str, Dict[str, str]], group_names: Dict[str, str], csv_writer: csv.DictWriter, lock: threading.Lock, failure_count: List[int]) -> None:
+    # Revoke permissions for every pair through the SDK group permission APIs
+    revoke_perms = permissions_for_mask(revocation_mask(tuple(permissions)))
+    if "view_items" in permissions or "allow_viewing" in permissions:
+        success_msg = "Removed all permissions except manage_vault"
+    else:
+        success_msg = f"Removed permissions: {','.join(revoke_perms)}"
+    print(f"{CYAN}Updating group permissions with the 1Password SDK...{RESET}")
+    outcomes = session.call(revoke_pairs_sdk_async(session.sdk(), pairs, sdk_mask(revocation_mask(tuple(permissions)))))
+    for vault_id, group_id in pairs:
+        status, error_msg = outcomes[(vault_id, group_id)]
+        if status == "Failed":
+            failure_count[0] += 1
+        with lock:
+            csv_writer.writerow({
+                "Timestamp": datetime.now().isoformat(),
+                "Vault_ID": vault_id,
+                "Vault_Name": vault_names.get(group_id, {}).get(vault_id, vault_id),
+                "Group_ID": group_id,
+                "Group_Name": group_names.get(group_id, group_id),
+                "Status": status,
+                "Error": error_msg or success_msg
+            })
 
 def show_table(data: List[Dict[str, str]]) -> None:
     # Display a styled ASCII table for groups or vaults
@@ -323,14 +435,13 @@ def show_table(data: List[Dict[str, str]]) -> None:
 
 def run_op_command(args: List[str]) -> Tuple[str, str]:
     # Run a 1Password CLI command and return stdout, stderr
-    cmd = ["op"] + args
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return result.stdout, ""
-    except subprocess.CalledProcessError as e:
-        return "", e.stderr.strip() or f"Unknown CLI error (command: {' '.join(cmd)})"
+        result = session.run(args)
     except FileNotFoundError:
         return "", "1Password CLI ('op') not found. Please ensure it is installed."
+    if result.returncode != 0:
+        return "", result.stderr.strip() or f"Unknown CLI error (command: {' '.join(['op'] + args)})"
+    return result.stdout, ""
 
 def check_op_auth() -> bool:
     # Check if authenticated with 1Password CLI; sign in if needed
@@ -344,29 +455,24 @@ def check_op_auth() -> bool:
     if not account:
         print(f"{RED}⚠️ Account shorthand required{RESET}\n")
         return False
-    stdout, stderr = run_op_command(["signin", "--account", account, "--raw"])
-    if stdout:
-        os.environ[f"OP_SESSION_{account}"] = stdout.strip()
+    signed_in, stderr = session.signin(account)
+    if signed_in:
         print(f"{GREEN}✅ Signed in successfully{RESET}\n")
         return True
     print(f"{RED}⚠️ Sign-in failed: {stderr}{RESET}\n")
     return False
 
-def get_vaults_for_group(group_id: str, group_name: str) -> List[Tuple[str, str]]:
-    # Get vaults a group has access to using op vault list --group
-    cmd = ["vault", "list", "--group", group_id]
+def get_vaults_for_group(group_id: str, group_name: str) -> Tuple[List[Tuple[str, str]], str]:
+    # Get vaults a group has access to using op vault list --group; returns (vaults, error)
+    cmd = ["vault", "list", "--group", group_id, "--format=json"]
     stdout, stderr = run_op_command(cmd)
-    if stdout:
-        vaults = []
-        for line in stdout.strip().splitlines()[1:]:
-            parts = line.split(maxsplit=1)
-            if len(parts) >= 2:
-                vaults.append((parts[0], parts[1]))
+    if not stderr:
+        vaults = [(vault["id"], vault["name"]) for vault in json.loads(stdout or "[]")]
         if not vaults:
             print(f"{YELLOW}⚠️ No vaults found for group {group_name} ({group_id}){RESET}")
-        return vaults
+        return vaults, ""
     print(f"{RED}⚠️ Failed to list vaults for group {group_name} ({group_id}): {stderr}{RESET}")
-    return []
+    return [], stderr
 
 def get_groups() -> List[Tuple[str, str]]:
     # Get all groups using op group list, excluding Recovery
@@ -450,10 +556,260 @@ def get_permissions() -> List[str]:
             continue
         return permissions
 
+# Reconciler: permission sets are held as masks of granular permissions, so
+# "allow_*" and granular names compare equal and are sent to the CLI as granular names
+GRANULAR_PERMISSIONS = [perm for perm in PERMISSION_ORDER if not perm.startswith("allow_")]
+BROAD_PERMISSIONS = {
+    "allow_viewing": ["view_items", "view_and_copy_passwords", "view_item_history"],
+    "allow_editing": ["create_items", "edit_items", "archive_items", "delete_items", "import_items", "export_items", "copy_and_share_items", "print_items"],
+    "allow_managing": ["manage_vault"],
+}
+
+# Permissions each granular permission needs before it can be granted (direct prerequisites)
+PERMISSION_PREREQUISITES = {
+    "view_items": [],
+    "create_items": ["view_items"],
+    "view_and_copy_passwords": ["view_items"],
+    "edit_items": ["view_and_copy_passwords"],
+    "archive_items": ["edit_items"],
+    "delete_items": ["edit_items"],
+    "view_item_history": ["view_and_copy_passwords"],
+    "import_items": ["create_items"],
+    "export_items": ["view_item_history"],
+    "copy_and_share_items": ["view_item_history"],
+    "print_items": ["view_and_copy_passwords"],
+    "manage_vault": [],
+}
+
+def permission_bits(names: List[str]) -> int:
+    bits = 0
+    for name in names:
+        for perm in BROAD_PERMISSIONS.get(name, [name]):
+            bits |= PERMISSION_BITS[perm]
+    return bits
+
+def permission_names(bits: int) -> List[str]:
+    return [perm for perm in GRANULAR_PERMISSIONS if bits & PERMISSION_BITS[perm]]
+
+def _prerequisite_mask(perm: str) -> int:
+    # Mask of every permission perm needs, followed transitively
+    mask = 0
+    for prerequisite in PERMISSION_PREREQUISITES[perm]:
+        mask |= PERMISSION_BITS[prerequisite] | _prerequisite_mask(prerequisite)
+    return mask
+
+PREREQUISITE_MASKS = {perm: _prerequisite_mask(perm) for perm in GRANULAR_PERMISSIONS}
+
+def desired_state_problems(bits: int) -> List[str]:
+    # Every held permission must come with all of its prerequisites
+    problems = []
+    for perm in permission_names(bits):
+        missing = PREREQUISITE_MASKS[perm] & ~bits
+        if missing:
+            problems.append(f"{perm} requires {', '.join(permission_names(missing))}")
+    return problems
+
+def load_desired_state(path: str) -> Tuple[List[Dict[str, str]], List[str]]:
+    # Read desired group permissions from a CSV (vault,group,permissions) or YAML file
+    # (a list of mappings with the same keys). Returns (entries, errors).
+    if path.lower().endswith((".yaml", ".yml")):
+        if not YAML_AVAILABLE:
+            return [], ["YAML desired-state files need PyYAML (pip install pyyaml); use CSV instead"]
+        with open(path) as f:
+            rows = yaml.safe_load(f) or []
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        vault = str(row.get("vault") or "").strip()
+        group = str(row.get("group") or "").strip()
+        permissions = row.get("permissions") or []
+        if isinstance(permissions, str):
+            permissions = permissions.split(",")
+        permissions = [str(perm).strip() for perm in permissions if str(perm).strip()]
+        if not vault or not group:
+            errors.append(f"Entry {number}: vault and group are required")
+            continue
+        invalid = [perm for perm in permissions if perm not in VALID_PERMISSIONS]
+        if invalid:
+            errors.append(f"Entry {number}: invalid permissions: {', '.join(invalid)}")
+            continue
+        bits = permission_bits(permissions)
+        problems = desired_state_problems(bits)
+        if problems:
+            errors.append(f"Entry {number} ({vault} / {group}): {'; '.join(problems)}")
+            continue
+        entries.append({"vault": vault, "group": group, "bits": bits})
+    return entries, errors
+
+def get_vault_group_permissions(vault_id: str) -> Tuple[Dict[str, int], str]:
+    # Current permission bits of every group on a vault; returns (bits by group ID, error)
+    stdout, stderr = run_op_command(["vault", "group", "list", vault_id, "--format=json"])
+    if stderr:
+        return {}, stderr
+    return {group["id"]: permission_bits([perm for perm in group.get("permissions", []) if perm in VALID_PERMISSIONS])
+            for group in json.loads(stdout or "[]")}, ""
+
+def reconcile_pair(change: Dict, csv_writer: csv.DictWriter, lock: threading.Lock, failure_count: List[int]) -> None:
+    # Grant first, then revoke, so the group never drops below its desired permissions
+    done = []
+    error_msg = ""
+    for action, bits in (("grant", change["grant"]), ("revoke", change["revoke"])):
+        if not bits:
+            continue
+        result = session.run(["vault", "group", action, "--vault", change["vault_id"], "--group", change["group_id"],
+                              "--permissions", ",".join(permission_names(bits)), "--no-input"])
+        if result.returncode != 0:
+            error_msg = result.stderr.strip() or f"Unknown CLI error while trying to {action} permissions"
+            break
+        done.append(f"{'Granted' if action == 'grant' else 'Revoked'}: {','.join(permission_names(bits))}")
+    if error_msg:
+        with results_lock:
+            failure_count[0] += 1
+    with lock:
+        csv_writer.writerow({
+            "Timestamp": datetime.now().isoformat(),
+            "Vault_ID": change["vault_id"],
+            "Vault_Name": change["vault_name"],
+            "Group_ID": change["group_id"],
+            "Group_Name": change["group_name"],
+            "Status": "Failed" if error_msg else "Success",
+            "Error": "; ".join(done + ([error_msg] if error_msg else []))
+        })
+
+def reconcile(path: str, dry_run: bool) -> int:
+    # Bring group vault permissions in line with a desired-state file. Only the listed
+    # vault-group pairs are touched; an empty permission list removes the group's access.
+    entries, errors = load_desired_state(path)
+    if errors:
+        print(f"{RED}⚠️ The desired-state file has problems:{RESET}")
+        for error in errors:
+            print(f"  - {error}")
+        return 1
+
+    # Resolve vault and group names once
+    stdout, stderr = run_op_command(["vault", "list", "--format=json"])
+    if stderr:
+        print(f"{RED}⚠️ Failed to list vaults: {stderr}{RESET}")
+        return 1
+    vaults = {vault["id"]: vault["name"] for vault in json.loads(stdout or "[]")}
+    stdout, stderr = run_op_command(["group", "list", "--format=json"])
+    if stderr:
+        print(f"{RED}⚠️ Failed to list groups: {stderr}{RESET}")
+        return 1
+    groups = {group["id"]: group["name"] for group in json.loads(stdout or "[]")}
+    vault_ids = {name: vault_id for vault_id, name in vaults.items()}
+    group_ids = {name: group_id for group_id, name in groups.items()}
+
+    desired = {}
+    unknown = []
+    for entry in entries:
+        vault_id = entry["vault"] if entry["vault"] in vaults else vault_ids.get(entry["vault"])
+        group_id = entry["group"] if entry["group"] in groups else group_ids.get(entry["group"])
+        if not vault_id or not group_id:
+            unknown.append(f"{entry['vault']} / {entry['group']}")
+            continue
+        desired[(vault_id, group_id)] = entry["bits"]
+    if unknown:
+        print(f"{RED}⚠️ Unknown vaults or groups in the desired-state file:{RESET}")
+        for pair in unknown:
+            print(f"  - {pair}")
+        return 1
+
+    # Fetch the current state once per vault, concurrently
+    vault_list = list(dict.fromkeys(vault_id for vault_id, _ in desired))
+    print(f"{CYAN}Reading current permissions for {len(vault_list)} vault(s)...{RESET}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        current = dict(zip(vault_list, executor.map(get_vault_group_permissions, vault_list)))
+    failed_vaults = {vault_id: error for vault_id, (_, error) in current.items() if error}
+    for vault_id, error in failed_vaults.items():
+        print(f"{RED}⚠️ Failed to read permissions for vault {vaults[vault_id]} ({vault_id}): {error}{RESET}")
+
+    changes = []
+    unchanged = 0
+    for (vault_id, group_id), bits in desired.items():
+        if vault_id in failed_vaults:
+            continue
+        held = current[vault_id][0].get(group_id, 0)
+        if held == bits:
+            unchanged += 1
+            continue
+        changes.append({
+            "vault_id": vault_id, "vault_name": vaults[vault_id],
+            "group_id": group_id, "group_name": groups[group_id],
+            "grant": bits & ~held, "revoke": held & ~bits,
+        })
+
+    calls = sum(bool(change["grant"]) + bool(change["revoke"]) for change in changes)
+    print(f"{CYAN}{len(changes)} pair(s) to change, {unchanged} already as desired; {calls} CLI call(s){RESET}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_file = f"vault_permission_reconcile_{timestamp}.csv"
+    csv_fields = ["Timestamp", "Vault_ID", "Vault_Name", "Group_ID", "Group_Name", "Status", "Error"]
+    lock = threading.Lock()
+    failure_count = [len(failed_vaults)]
+    with open(csv_file, "w", newline="") as f:
+        csv_writer = csv.DictWriter(f, fieldnames=csv_fields)
+        csv_writer.writeheader()
+        if dry_run:
+            for change in changes:
+                plan = [f"{label}: {','.join(permission_names(change[key]))}" for key, label in (("grant", "Would grant"), ("revoke", "Would revoke")) if change[key]]
+                print(f"  - {change['vault_name']} / {change['group_name']}: {'; '.join(plan)}")
+                csv_writer.writerow({
+                    "Timestamp": datetime.now().isoformat(),
+                    "Vault_ID": change["vault_id"],
+                    "Vault_Name": change["vault_name"],
+                    "Group_ID": change["group_id"],
+                    "Group_Name": change["group_name"],
+                    "Status": "Planned",
+                    "Error": "; ".join(plan)
+                })
+            print(f"\n{GREEN}Dry run complete; nothing was changed. Plan saved to {os.path.abspath(csv_file)}{RESET}")
+            return 0
+        with tqdm(total=len(changes), desc="Reconciling", unit="pair") as pbar, ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(reconcile_pair, change, csv_writer, lock, failure_count) for change in changes]:
+                future.add_done_callback(lambda _: pbar.update(1))
+
+    print(f"\n{GREEN}🎉 Done! Results saved to {os.path.abspath(csv_file)}{RESET}")
+    if failure_count[0] > 0:
+        print(f"{YELLOW}⚠️ {failure_count[0]} vault(s) or pair(s) failed to reconcile. See the output above and the CSV for details.{RESET}")
+        return 1
+    return 0
+
 def main() -> None:
+    global max_workers
+    parser = argparse.ArgumentParser(description="Remove vault permissions from 1Password groups.")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Maximum number of concurrent 1Password CLI calls (default {DEFAULT_MAX_WORKERS}).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show the effective revocation for every vault-group pair and the number of CLI calls, without revoking anything.")
+    parser.add_argument("--reconcile", metavar="DESIRED_STATE",
+                        help="Grant and revoke only what is needed to match a desired-state CSV or YAML file of vault, group and permissions.")
+    parser.add_argument("--sdk", action="store_true",
+                        help="Revoke through the 1Password SDK's group permission APIs in batches. Requires OP_SERVICE_ACCOUNT_TOKEN and `pip install onepassword-sdk`.")
+    args = parser.parse_args()
+    max_workers = max(1, args.max_workers)
+    session.limiter = AdaptiveLimiter(max_workers)
+
     # Ensure we're authenticated before starting
     if not check_op_auth():
         sys.exit(1)
+    if args.sdk:
+        try:
+            client = session.sdk()
+        except Exception as e:
+            print(f"{RED}⚠️ Failed to authenticate with the 1Password SDK: {e}{RESET}")
+            sys.exit(1)
+        if client is None:
+            print(f"{RED}⚠️ --sdk needs OP_SERVICE_ACCOUNT_TOKEN and the onepassword-sdk package (pip install onepassword-sdk).{RESET}")
+            sys.exit(1)
+        print(f"{GREEN}✅ Authenticated with the 1Password SDK{RESET}\n")
+
+    if args.reconcile:
+        sys.exit(reconcile(args.reconcile, args.dry_run))
 
     print(f"{CYAN}🚀 Removing permissions...{RESET}\n")
 
@@ -471,19 +827,18 @@ def main() -> None:
         selected_groups = get_groups_selection()
         print(f"\n{CYAN}Groups: {', '.join(g[1] for g in selected_groups)}{RESET}")
 
-        # Get vaults for all groups with feedback
+        # Get vaults for all groups concurrently with feedback
         print(f"{CYAN}Gathering vault information...{RESET}", end="\r")
         vault_names = {}  # Map group_id to {vault_id: vault_name}
         group_names = {g[0]: g[1] for g in selected_groups}
         all_vaults = set()
         group_vault_pairs = []
         errors = []
-        for group_id, group_name in selected_groups:
-            vaults = get_vaults_for_group(group_id, group_name)
-            if not vaults:
-                _, stderr = run_op_command(["vault", "list", "--group", group_id])
-                if stderr:
-                    errors.append(f"Failed to list vaults for group {group_name} ({group_id}): {stderr}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            group_vaults = list(executor.map(lambda g: get_vaults_for_group(*g), selected_groups))
+        for (group_id, group_name), (vaults, error) in zip(selected_groups, group_vaults):
+            if error:
+                errors.append(f"Failed to list vaults for group {group_name} ({group_id}): {error}")
             vault_names[group_id] = {v[0]: v[1] for v in vaults}
             for vault_id, _ in vaults:
                 if (vault_id, group_id) not in all_vaults:
@@ -595,30 +950,37 @@ def main() -> None:
                 print(f"{YELLOW}⚠️ Cancelled{RESET}")
                 sys.exit(0)
 
+        # Show the effective revocation, expanded through the dependency closure
+        revoke_perms = permissions_for_mask(revocation_mask(tuple(confirmed_permissions)))
+        print(f"\n{CYAN}Effective revocation: {', '.join(revoke_perms)}{RESET}")
+        if args.sdk:
+            batches = -(-len(selected_pairs) // SDK_BATCH_SIZE)
+            print(f"{CYAN}SDK calls: {len(dict.fromkeys(g for _, g in selected_pairs))} group read(s), at most {batches} batched update(s) plus one revoke per pair left with no permissions{RESET}")
+        else:
+            print(f"{CYAN}CLI calls: {len(selected_pairs)} revoke call(s), one per vault-group pair{RESET}")
+        if args.dry_run:
+            for vault_id, group_id in selected_pairs:
+                vault_name = vault_names.get(group_id, {}).get(vault_id, vault_id)
+                print(f"  - {vault_name} / {group_names.get(group_id, group_id)}: {','.join(revoke_perms)}")
+                csv_writer.writerow({
+                    "Timestamp": datetime.now().isoformat(),
+                    "Vault_ID": vault_id,
+                    "Vault_Name": vault_name,
+                    "Group_ID": group_id,
+                    "Group_Name": group_names.get(group_id, group_id),
+                    "Status": "Planned",
+                    "Error": f"Would revoke: {','.join(revoke_perms)}"
+                })
+            print(f"\n{GREEN}Dry run complete; nothing was revoked. Plan saved to {os.path.abspath(csv_file)}{RESET}")
+            return
+
         # Process vault-group pairs: check and revoke permissions
         print(f"\n{CYAN}Processing {len(selected_pairs)} vault-group pair(s)...{RESET}")
-        failure_count = [0]  # Use a list to allow modification in thread
-        process_thread_running.set()
-        process_thread = threading.Thread(target=process_vaults, args=(confirmed_permissions, vault_names, group_names, csv_writer, failure_count))
-        process_thread.daemon = True
-        process_thread.start()
-
-        for vault_id, group_id in selected_pairs:
-            process_queue.put((vault_id, group_id, lock))
-
-        with tqdm(total=len(selected_pairs), desc="Processing", unit="pair") as pbar:
-            while not process_queue.empty():
-                pbar.n = len(selected_pairs) - process_queue.qsize()
-                pbar.refresh()
-                time.sleep(0.1)
-            pbar.n = len(selected_pairs)
-            pbar.refresh()
-
-        process_queue.join()
-        process_thread_running.clear()
-        process_thread.join()
-        sys.stdout.write(f"\r{' ' * 50}\r")
-        sys.stdout.flush()
+        failure_count = [0]  # Use a list to allow modification in worker threads
+        if args.sdk:
+            revoke_pairs_sdk(selected_pairs, confirmed_permissions, vault_names, group_names, csv_writer, lock, failure_count)
+        else:
+            process_vaults(selected_pairs, confirmed_permissions, vault_names, group_names, csv_writer, lock, failure_count)
 
         # All done!
         full_csv_path = os.path.abspath(csv_file)
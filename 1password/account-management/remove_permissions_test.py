@@ -0,0 +1,41 @@
+# Checks the reconciler's permission prerequisite table against known role combinations.
+import importlib.util
+import os
+
+# The script has hyphens in its name, so load it by path
+spec = importlib.util.spec_from_file_location(
+    "remove_permissions",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "remove-permissions-groups-and-vault.py"),
+)
+remove_permissions = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(remove_permissions)
+
+
+def problems(permissions):
+    return remove_permissions.desired_state_problems(remove_permissions.permission_bits(permissions))
+
+
+def test_valid_combinations():
+    for permissions in (
+        [],
+        ["view_items"],
+        ["manage_vault"],
+        ["view_items", "create_items"],
+        ["view_items", "view_and_copy_passwords"],
+        ["view_items", "view_and_copy_passwords", "print_items"],
+        ["view_items", "view_and_copy_passwords", "view_item_history", "copy_and_share_items"],
+        ["view_items", "view_and_copy_passwords", "edit_items", "archive_items", "delete_items"],
+        ["view_items", "create_items", "import_items"],
+        ["allow_viewing"],
+        ["allow_viewing", "allow_editing"],
+        ["allow_viewing", "allow_editing", "allow_managing"],
+    ):
+        assert problems(permissions) == [], permissions
+
+
+def test_missing_prerequisites():
+    assert problems(["edit_items"]) == ["edit_items requires view_items, view_and_copy_passwords"]
+    assert problems(["view_items", "view_and_copy_passwords", "archive_items"]) == ["archive_items requires edit_items"]
+    assert problems(["view_items", "view_and_copy_passwords", "export_items"]) == ["export_items requires view_item_history"]
+    assert problems(["view_items", "import_items"]) == ["import_items requires create_items"]
+    assert problems(["allow_editing"]) != []
@@ -1,36 +1,52 @@
 #!/usr/bin/env python3
 
+import argparse
 import csv
+import hashlib
+import hmac
 import json
 import subprocess
 import sys
 import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Shared CLI/SDK session layer in the 1password directory
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+)
+from op_session import AdaptiveLimiter, OpSession
+
+# One 1Password session shared by every CLI call in this run
+session = OpSession()
+
+# Default number of concurrent item edits in --concurrent mode
+DEFAULT_MAX_WORKERS = 8
+
+# Error prefix for CSV rows whose title matches more than one item
+AMBIGUOUS_TITLE = "Ambiguous title"
+
+STATUS_FIELDS = ["line", "vault", "item title", "item id", "field", "status", "error"]
+
+# Items fetched per SDK items.get_all call in --sdk mode
+SDK_BATCH_SIZE = 50
+
+# Set by --sdk: read and write items with the session's SDK client instead of op
+use_sdk = False
 
 
 def run_op_command(command_args):
     """
-    Runs an 'op' command and returns its stdout.
+    Runs an 'op' command on the shared session and returns its stdout.
     Raises subprocess.CalledProcessError on failure.
     """
+    # Accept both ["op", "item", ...] and ["item", ...]
+    if command_args and command_args[0] == "op":
+        command_args = command_args[1:]
     try:
-        # Ensure OP_CONNECT_HOST and OP_CONNECT_TOKEN are not set if using biometric unlock
-        # or normal op sign-in, as they are for 1Password Connect.
-        # However, if the user *is* using Connect, they should have these set.
-        # For general CLI usage, it's better not to interfere with existing env vars
-        # unless specifically managing Connect tokens.
-        # For this script, we assume standard 'op' CLI usage.
-
-        process = subprocess.run(
-            command_args,
-            capture_output=True,
-            text=True,
-            check=True,  # Raises CalledProcessError for non-zero exit codes
-            encoding="utf-8",
-        )
-        return process.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        # The error will be caught by the caller, which can print stderr
-        raise e
+        process = session.run(command_args)
     except FileNotFoundError:
         print(
             "Error: The 'op' command-line tool was not found. "
@@ -38,19 +54,21 @@ def run_op_command(command_args):
             file=sys.stderr,
         )
         sys.exit(1)
-    except Exception as e:
-        print(
-            f"An unexpected error occurred while trying to run 'op' command: {e}",
-            file=sys.stderr,
+    if process.returncode != 0:
+        # The error will be caught by the caller, which can print stderr
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            ["op"] + command_args,
+            output=process.stdout,
+            stderr=process.stderr,
         )
-        raise e
+    return process.stdout.strip()
 
 
-def find_concealed_field_assignment_key(item_data):
+def find_concealed_field(item_data):
     """
-    Finds the assignment key for the concealed field to update.
-    Prioritizes the primary password field, then the first generic concealed field.
-    Returns the assignment key (e.g., "password" or "Section.Label") or None.
+    Finds the concealed field to update: the primary password field, else
+    the first generic concealed field. Returns the field's JSON or None.
     """
     if not item_data or "fields" not in item_data:
         return None
@@ -66,10 +84,16 @@ def find_concealed_field_assignment_key(item_data):
             if not first_concealed_field:
                 first_concealed_field = field
 
-    target_field = (
-        primary_password_field if primary_password_field else first_concealed_field
-    )
+    return primary_password_field if primary_password_field else first_concealed_field
+
 
+def find_concealed_field_assignment_key(item_data):
+    """
+    Finds the assignment key for the concealed field to update.
+    Prioritizes the primary password field, then the first generic concealed field.
+    Returns the assignment key (e.g., "password" or "Section.Label") or None.
+    """
+    target_field = find_concealed_field(item_data)
     if not target_field:
         return None
 
@@ -92,9 +116,268 @@ def find_concealed_field_assignment_key(item_data):
         return field_label
 
 
-def update_password_from_csv(csv_filepath):
+sdk_vault_ids = None
+sdk_vault_lock = threading.Lock()
+
+
+def load_sdk_vault_ids():
+    """
+    Lists the vaults once with the SDK and maps each vault's title and ID
+    to the matching vault IDs, so CSV rows can name vaults either way.
+    """
+    global sdk_vault_ids
+    with sdk_vault_lock:
+        if sdk_vault_ids is None:
+            client = session.sdk()
+            vault_ids = {}
+            for vault in session.call(session.limited(lambda: client.vaults.list())):
+                vault_ids.setdefault(vault.title, []).append(vault.id)
+                vault_ids[vault.id] = [vault.id]
+            sdk_vault_ids = vault_ids
+    return sdk_vault_ids
+
+
+def resolve_vault_id_sdk(vault_name):
+    """
+    Resolves a CSV vault name or ID to a vault ID. Raises LookupError.
+    """
+    vault_ids = load_sdk_vault_ids().get(vault_name, [])
+    if not vault_ids:
+        raise LookupError(f"Vault '{vault_name}' not found")
+    if len(vault_ids) > 1:
+        raise LookupError(f"More than one vault is named '{vault_name}'; use its ID")
+    return vault_ids[0]
+
+
+def sdk_item_json(item):
+    """
+    Shapes an SDK item like 'op item get --format json' output, so the same
+    field selection applies in both modes. The SDK item is kept under
+    "sdk_item" for the write.
+    """
+    sections = {section.id: section.title for section in item.sections}
+    fields = []
+    for field in item.fields:
+        shaped = {"id": field.id, "type": field.field_type.value.upper(), "label": field.title}
+        # The built-in password field has no section
+        if field.id == "password" and not field.section_id:
+            shaped["purpose"] = "PASSWORD"
+        if field.section_id:
+            shaped["section"] = {"id": field.section_id, "label": sections.get(field.section_id, "")}
+        fields.append(shaped)
+    return {"id": item.id, "title": item.title, "vault": {"id": item.vault_id}, "fields": fields, "sdk_item": item}
+
+
+def build_title_index(vault_name):
+    """
+    Lists a vault once and indexes its items by title.
+    Returns (title -> [item ids], item id -> item overview).
+    Raises subprocess.CalledProcessError, or LookupError and SDK errors with --sdk.
+    """
+    if use_sdk:
+        client = session.sdk()
+        vault_id = resolve_vault_id_sdk(vault_name)
+        overviews = [
+            {"id": overview.id, "title": overview.title, "vault": {"id": overview.vault_id}}
+            for overview in session.call(session.limited(lambda: client.items.list(vault_id)))
+        ]
+    else:
+        overviews = json.loads(
+            run_op_command(["item", "list", "--vault", vault_name, "--format", "json"]) or "[]"
+        )
+    title_index = {}
+    for overview in overviews:
+        title_index.setdefault(overview.get("title"), []).append(overview["id"])
+    return title_index, {overview["id"]: overview for overview in overviews}
+
+
+def index_vaults(vault_names, max_workers=1):
+    """
+    Builds the title index of every vault, listing each vault once.
+    Returns a dict of vault -> (title index, overviews by id, error).
+    """
+
+    def index(vault_name):
+        try:
+            return (*build_title_index(vault_name), "")
+        except subprocess.CalledProcessError as e:
+            return {}, {}, e.stderr.strip() if e.stderr else "Unknown CLI error"
+        except json.JSONDecodeError:
+            return {}, {}, "Could not parse JSON output"
+        except Exception as e:  # LookupError or an SDK error with --sdk
+            return {}, {}, str(e)
+
+    vault_names = list(dict.fromkeys(vault_names))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(vault_names, executor.map(index, vault_names)))
+
+
+def resolve_item_id(vault_index, title):
+    """
+    Resolves a title with a vault's index entry. Returns (item id, error).
+    """
+    title_index, _, error = vault_index
+    if error:
+        return None, error
+    item_ids = title_index.get(title, [])
+    if not item_ids:
+        return None, "Item not found"
+    if len(item_ids) > 1:
+        return None, f"{AMBIGUOUS_TITLE}: {len(item_ids)} items ({', '.join(item_ids)})"
+    return item_ids[0], ""
+
+
+def report_ambiguous_titles(rows, vault_indexes):
+    """
+    Prints every CSV row whose title matches more than one item, before any edits.
+    rows are (line number, vault, title) tuples.
+    """
+    ambiguous = []
+    for line_num, vault_name, title in rows:
+        item_id, error = resolve_item_id(vault_indexes[vault_name], title)
+        if error.startswith(AMBIGUOUS_TITLE):
+            ambiguous.append((line_num, vault_name, title, error))
+    if ambiguous:
+        print(
+            f"Warning: {len(ambiguous)} row(s) match more than one item and will be skipped:",
+            file=sys.stderr,
+        )
+        for line_num, vault_name, title, error in ambiguous:
+            print(
+                f"  CSV line {line_num}: '{title}' in vault '{vault_name}': {error}",
+                file=sys.stderr,
+            )
+
+
+JOURNAL_FIELDS = ["timestamp", "vault", "item id", "password hmac"]
+
+
+def password_hash(key, item_id, new_password):
+    """
+    HMAC-SHA256 of a new password and its item ID, keyed with the journal's
+    secret key. Equal passwords on different items produce different values,
+    and without the key file the journal can't be used to test guesses.
+    """
+    return hmac.new(key, f"{item_id}:{new_password}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def load_journal_key(path):
+    """
+    Reads the journal's HMAC key from path, creating a random one readable
+    only by the current user if it doesn't exist yet.
+    """
+    try:
+        with open(path) as f:
+            return bytes.fromhex(f.read().strip())
+    except FileNotFoundError:
+        pass
+    key = secrets.token_bytes(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key.hex() + "\n")
+    return key
+
+
+class RotationJournal:
+    """
+    Append-only record of applied rotations, keyed by (vault, item id, password HMAC).
+    Each entry is flushed to disk as soon as its edit succeeds, so a restart
+    skips exactly the rows that were already applied. The HMAC key is kept
+    in <journal>.key next to the journal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.lock = threading.Lock()
+        key_path = f"{path}.key"
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, newline="") as f:
+                reader = csv.DictReader(f)
+                entries = list(reader)
+            if reader.fieldnames != JOURNAL_FIELDS or (entries and not os.path.exists(key_path)):
+                # Entries written in another format, or whose key is gone, can't be matched
+                os.replace(path, f"{path}.old")
+                print(
+                    f"Warning: {path} can't be read with the current key or format; "
+                    f"moved it to {path}.old and starting a new journal.",
+                    file=sys.stderr,
+                )
+                entries = []
+            for entry in entries:
+                self.done.add((entry["vault"], entry["item id"], entry["password hmac"]))
+        self.secret = load_journal_key(key_path)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=JOURNAL_FIELDS)
+        if is_new:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def key(self, vault_name, item_id, new_password):
+        return (vault_name, item_id, password_hash(self.secret, item_id, new_password))
+
+    def is_done(self, vault_name, item_id, new_password):
+        return self.key(vault_name, item_id, new_password) in self.done
+
+    def record(self, vault_name, item_id, new_password):
+        key = self.key(vault_name, item_id, new_password)
+        with self.lock:
+            self.writer.writerow(
+                {
+                    "timestamp": datetime.now().isoformat(),
+                    "vault": key[0],
+                    "item id": key[1],
+                    "password hmac": key[2],
+                }
+            )
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.done.add(key)
+
+    def close(self):
+        self.file.close()
+
+
+def print_journal_summary(rows, vault_indexes, journal):
+    """
+    Reconciles the CSV with the journal in one pass over the rows and prints
+    how many rows are applied and which are still outstanding.
+    rows are (line number, vault, title, new password) tuples.
+    """
+    matched = set()
+    outstanding = []
+    for line_num, vault_name, title, new_password in rows:
+        item_id, error = resolve_item_id(vault_indexes[vault_name], title)
+        key = journal.key(vault_name, item_id, new_password) if item_id else None
+        if key in journal.done:
+            matched.add(key)
+        else:
+            outstanding.append((line_num, title, vault_name, error))
+    print(
+        f"\nJournal summary: {len(matched)} of {len(rows)} row(s) applied, "
+        f"{len(outstanding)} outstanding."
+    )
+    for line_num, title, vault_name, error in outstanding:
+        print(
+            f"  CSV line {line_num}: '{title}' in vault '{vault_name}'"
+            + (f" ({error})" if error else ""),
+            file=sys.stderr,
+        )
+    other = len(journal.done) - len(matched)
+    if other:
+        print(
+            f"  {other} journal entr{'y' if other == 1 else 'ies'} match no row in this CSV "
+            "(earlier files or replaced passwords)."
+        )
+    return not outstanding
+
+
+def update_password_from_csv(csv_filepath, journal=None):
     """
     Loads a CSV file and updates 1Password items based on its content.
+    Rows already recorded in the journal are skipped, and each successful
+    update is added to it.
     """
     try:
         with open(
@@ -116,7 +399,20 @@ def update_password_from_csv(csv_filepath):
                 print(f"Found headers: {', '.join(reader.fieldnames)}", file=sys.stderr)
                 return False
 
-            for i, row in enumerate(reader):
+            # Index every referenced vault once so rows resolve to item IDs
+            # without a title search per row
+            csv_rows = list(reader)
+            vault_indexes = index_vaults(row["vault"] for row in csv_rows if row["vault"])
+            report_ambiguous_titles(
+                [
+                    (i + 2, row["vault"], row["item title"])
+                    for i, row in enumerate(csv_rows)
+                    if row["vault"] and row["item title"]
+                ],
+                vault_indexes,
+            )
+
+            for i, row in enumerate(csv_rows):
                 line_num = i + 2  # For user-friendly line numbers (1-based + header)
                 try:
                     vault_name = row["vault"]
@@ -135,16 +431,29 @@ def update_password_from_csv(csv_filepath):
                         f"\nProcessing CSV line {line_num}: Vault='{vault_name}', Item='{item_title}'"
                     )
 
+                    item_id, error = resolve_item_id(
+                        vault_indexes[vault_name], item_title
+                    )
+                    if not item_id:
+                        print(
+                            f"  Error: {error} for item '{item_title}' in vault '{vault_name}'. Skipping.",
+                            file=sys.stderr,
+                        )
+                        continue
+                    if journal and journal.is_done(vault_name, item_id, new_password):
+                        print("  Already applied according to the journal. Skipping.")
+                        continue
+
                     # 1. Fetch the item
                     print(
-                        f"  Fetching item '{item_title}' from vault '{vault_name}'..."
+                        f"  Fetching item '{item_title}' ({item_id}) from vault '{vault_name}'..."
                     )
                     item_json_str = run_op_command(
                         [
                             "op",
                             "item",
                             "get",
-                            item_title,
+                            item_id,
                             "--vault",
                             vault_name,
                             "--format",
@@ -177,12 +486,14 @@ def update_password_from_csv(csv_filepath):
                             "op",
                             "item",
                             "edit",
-                            item_title,
+                            item_id,
                             "--vault",
                             vault_name,
                             field_assignment,
                         ]
                     )
+                    if journal:
+                        journal.record(vault_name, item_id, new_password)
                     print(
                         f"  Successfully updated password for '{item_title}' in vault '{vault_name}'."
                     )
@@ -215,6 +526,16 @@ def update_password_from_csv(csv_filepath):
                         f"  An unexpected error occurred for item '{item_title}' (CSV line {line_num}): {e}",
                         file=sys.stderr,
                     )
+            if journal:
+                print_journal_summary(
+                    [
+                        (i + 2, row["vault"], row["item title"], row["new password"])
+                        for i, row in enumerate(csv_rows)
+                        if all([row["vault"], row["item title"], row["new password"]])
+                    ],
+                    vault_indexes,
+                    journal,
+                )
         return True
 
     except FileNotFoundError:
@@ -228,34 +549,415 @@ def update_password_from_csv(csv_filepath):
         return False
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python update_op_passwords.py <path_to_csv_file>")
-        print("The CSV file must contain the headers: vault, item title, new password")
-        sys.exit(1)
+def read_csv_rows(csv_filepath):
+    """
+    Reads and validates the whole CSV file.
+    Returns a list of row dicts (line, vault, title, password), or None if the
+    headers are wrong. Rows with missing values are reported and left out.
+    """
+    with open(csv_filepath, mode="r", encoding="utf-8-sig") as csvfile:
+        reader = csv.DictReader(csvfile)
+        required_headers = ["vault", "item title", "new password"]
+        if not reader.fieldnames or not all(
+            header in reader.fieldnames for header in required_headers
+        ):
+            missing = [h for h in required_headers if h not in (reader.fieldnames or [])]
+            print(
+                f"Error: CSV file is missing required headers: {', '.join(missing)}",
+                file=sys.stderr,
+            )
+            return None
+        rows = []
+        for i, row in enumerate(reader):
+            line_num = i + 2
+            if not all([row["vault"], row["item title"], row["new password"]]):
+                print(
+                    f"Warning: Skipping CSV line {line_num} due to missing values "
+                    f"(vault, item title, or new password).",
+                    file=sys.stderr,
+                )
+                continue
+            rows.append(
+                {
+                    "line": line_num,
+                    "vault": row["vault"],
+                    "title": row["item title"],
+                    "password": row["new password"],
+                }
+            )
+        return rows
 
-    csv_file_path = sys.argv[1]
-    print(f"Starting 1Password item update process using CSV: {csv_file_path}")
 
-    # Basic check for 'op' CLI sign-in status
+def parse_json_stream(text):
+    """
+    Parses the concatenated JSON objects that 'op item get -' prints.
+    """
+    decoder = json.JSONDecoder()
+    objects = []
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position >= len(text):
+            return objects
+        obj, position = decoder.raw_decode(text, position)
+        objects.append(obj)
+
+
+def fetch_items(overviews):
+    """
+    Fetches the full details of the given item overviews with one piped
+    'op item get -' call. Returns a dict of item id -> item JSON.
+    Raises subprocess.CalledProcessError.
+    """
+    if not overviews:
+        return {}
+    if use_sdk:
+        return fetch_items_sdk(overviews)
+    process = session.run(["item", "get", "-", "--format", "json"], input=json.dumps(overviews))
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            ["op", "item", "get", "-"],
+            output=process.stdout,
+            stderr=process.stderr,
+        )
+    return {item["id"]: item for item in parse_json_stream(process.stdout)}
+
+
+def fetch_items_sdk(overviews):
+    """
+    Fetches the given item overviews with SDK items.get_all calls of up to
+    SDK_BATCH_SIZE items per vault. Items that fail to load are left out.
+    Returns a dict of item id -> item JSON shaped by sdk_item_json.
+    """
+    client = session.sdk()
+    item_ids_by_vault = {}
+    for overview in overviews:
+        item_ids_by_vault.setdefault(overview["vault"]["id"], []).append(overview["id"])
+    items = {}
+    for vault_id, item_ids in item_ids_by_vault.items():
+        for start in range(0, len(item_ids), SDK_BATCH_SIZE):
+            batch = item_ids[start:start + SDK_BATCH_SIZE]
+            response = session.call(session.limited(lambda: client.items.get_all(vault_id, batch)))
+            for result in response.individual_responses:
+                if result.error is None:
+                    items[result.content.id] = sdk_item_json(result.content)
+    return items
+
+
+def put_concealed_field_sdk(item_data, field, new_password):
+    """
+    Sets the chosen concealed field on the SDK item and writes it back with
+    items.put through the session's limiter.
+    """
+    item = item_data["sdk_item"]
+    section_id = field.get("section", {}).get("id")
+    for sdk_field in item.fields:
+        if sdk_field.id == field["id"] and sdk_field.section_id == section_id:
+            sdk_field.value = new_password
+    client = session.sdk()
+    session.call(session.limited(lambda: client.items.put(item)))
+
+
+def update_row(row, item_data, journal=None):
+    """
+    Edits one item's concealed field and returns the row's status record.
+    Successful edits are recorded in the journal.
+    """
+    status = {
+        "line": row["line"],
+        "vault": row["vault"],
+        "item title": row["title"],
+        "item id": item_data.get("id", ""),
+        "field": "",
+        "status": "Failed",
+        "error": "",
+    }
+    assignment_key_base = find_concealed_field_assignment_key(item_data)
+    if not assignment_key_base:
+        status["error"] = "Could not find a suitable concealed field"
+        return status
+    status["field"] = assignment_key_base
     try:
-        run_op_command(
-            ["op", "account", "list"]
-        )  # A simple command to check if op is working and signed in
-        print("Successfully connected to 1Password CLI.")
+        if "sdk_item" in item_data:
+            put_concealed_field_sdk(item_data, find_concealed_field(item_data), row["password"])
+        else:
+            run_op_command(
+                [
+                    "item",
+                    "edit",
+                    item_data["id"],
+                    "--vault",
+                    row["vault"],
+                    f"{assignment_key_base}={row['password']}",
+                ]
+            )
+        if journal:
+            journal.record(row["vault"], item_data["id"], row["password"])
+        status["status"] = "Updated"
     except subprocess.CalledProcessError as e:
-        print(
-            "Error: 1Password CLI 'op account list' command failed. "
-            "Please ensure you are signed in to the 1Password CLI.",
-            file=sys.stderr,
+        status["error"] = e.stderr.strip() if e.stderr else "Unknown CLI error"
+    except Exception as e:  # an SDK error with --sdk
+        status["error"] = str(e) or type(e).__name__
+    return status
+
+
+def update_passwords_concurrently(csv_filepath, max_workers, status_filepath, journal=None):
+    """
+    Updates every item in the CSV file, fetching items in bulk per vault and
+    running the edits on a bounded worker pool. Writes one status row per CSV
+    row to status_filepath. Rows already in the journal are not fetched again.
+    Returns True when every row is updated or was already applied.
+    """
+    try:
+        rows = read_csv_rows(csv_filepath)
+    except FileNotFoundError:
+        print(f"Error: CSV file not found at '{csv_filepath}'", file=sys.stderr)
+        return False
+    if rows is None:
+        return False
+
+    # Group rows by vault so each vault is listed and fetched once
+    rows_by_vault = {}
+    for row in rows:
+        rows_by_vault.setdefault(row["vault"], []).append(row)
+    print(
+        f"Indexing {len(rows_by_vault)} vault(s) for {len(rows)} row(s)..."
+    )
+    vault_indexes = index_vaults(rows_by_vault, max_workers)
+    report_ambiguous_titles(
+        [(row["line"], row["vault"], row["title"]) for row in rows], vault_indexes
+    )
+
+    def fetch(vault_name):
+        # Resolve each row to an item ID, then fetch the vault's items in one call
+        _, overviews, _ = vault_indexes[vault_name]
+        resolved = {}
+        failed = []
+        applied = []
+        superseded = []
+        # Only the last row for each item is applied, so two rows never edit one item at once
+        last_rows = {}
+        for row in rows_by_vault[vault_name]:
+            item_id, error = resolve_item_id(vault_indexes[vault_name], row["title"])
+            if not item_id:
+                failed.append((row, error))
+            else:
+                if item_id in last_rows:
+                    superseded.append((last_rows[item_id], item_id))
+                last_rows[item_id] = row
+        for item_id, row in last_rows.items():
+            if journal and journal.is_done(vault_name, item_id, row["password"]):
+                applied.append((row, item_id))
+            else:
+                resolved[row["line"]] = item_id
+        superseded = [
+            (row, item_id, f"Superseded by CSV line {last_rows[item_id]['line']}")
+            for row, item_id in superseded
+        ]
+        try:
+            items = fetch_items([overviews[item_id] for item_id in dict.fromkeys(resolved.values())])
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.strip() if e.stderr else "Unknown CLI error"
+            return [], failed + [(row, error) for row in rows_by_vault[vault_name] if row["line"] in resolved], applied, superseded
+        except json.JSONDecodeError:
+            return [], failed + [(row, "Could not parse JSON output") for row in rows_by_vault[vault_name] if row["line"] in resolved], applied, superseded
+        except Exception as e:  # an SDK error with --sdk
+            return [], failed + [(row, str(e)) for row in rows_by_vault[vault_name] if row["line"] in resolved], applied, superseded
+        jobs = []
+        for row in rows_by_vault[vault_name]:
+            if row["line"] not in resolved:
+                continue
+            if resolved[row["line"]] in items:
+                jobs.append((row, items[resolved[row["line"]]]))
+            else:
+                failed.append((row, "Item could not be fetched"))
+        return jobs, failed, applied, superseded
+
+    results = []
+    jobs = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for vault_jobs, failed, applied, superseded in executor.map(fetch, rows_by_vault):
+            jobs.extend(vault_jobs)
+            for row, item_id, error in superseded:
+                results.append(
+                    {
+                        "line": row["line"],
+                        "vault": row["vault"],
+                        "item title": row["title"],
+                        "item id": item_id,
+                        "field": "",
+                        "status": "Skipped",
+                        "error": error,
+                    }
+                )
+            for row, item_id in applied:
+                results.append(
+                    {
+                        "line": row["line"],
+                        "vault": row["vault"],
+                        "item title": row["title"],
+                        "item id": item_id,
+                        "field": "",
+                        "status": "Already applied",
+                        "error": "",
+                    }
+                )
+            for row, error in failed:
+                if not error.startswith(AMBIGUOUS_TITLE):
+                    print(
+                        f"  Error fetching '{row['title']}' from vault '{row['vault']}' "
+                        f"(CSV line {row['line']}): {error}",
+                        file=sys.stderr,
+                    )
+                results.append(
+                    {
+                        "line": row["line"],
+                        "vault": row["vault"],
+                        "item title": row["title"],
+                        "item id": "",
+                        "field": "",
+                        "status": "Skipped" if error.startswith(AMBIGUOUS_TITLE) else "Failed",
+                        "error": error,
+                    }
+                )
+
+    print(f"Updating {len(jobs)} item(s) with up to {max_workers} concurrent edits...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(update_row, row, item, journal) for row, item in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            if result["status"] != "Updated":
+                print(
+                    f"  Error updating '{result['item title']}' in vault '{result['vault']}' "
+                    f"(CSV line {result['line']}): {result['error']}",
+                    file=sys.stderr,
+                )
+            print(f"  {done}/{len(jobs)} edits finished", end="\r")
+    print()
+
+    results.sort(key=lambda result: result["line"])
+    with open(status_filepath, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATUS_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    updated = sum(1 for result in results if result["status"] == "Updated")
+    already = sum(1 for result in results if result["status"] == "Already applied")
+    replaced = sum(1 for result in results if result["error"].startswith("Superseded by"))
+    print(
+        f"{updated} of {len(results)} row(s) updated, {already} already applied, "
+        f"{replaced} superseded by a later row for the same item. "
+        f"Per-row status written to {os.path.abspath(status_filepath)}"
+    )
+    if journal:
+        superseded_lines = {result["line"] for result in results if result["error"].startswith("Superseded by")}
+        print_journal_summary(
+            [
+                (row["line"], row["vault"], row["title"], row["password"])
+                for row in rows
+                if row["line"] not in superseded_lines
+            ],
+            vault_indexes,
+            journal,
         )
-        if e.stderr:
-            print(f"Details: {e.stderr.strip()}", file=sys.stderr)
-        sys.exit(1)
-    except FileNotFoundError:  # Already handled in run_op_command, but good for clarity
-        sys.exit(1)  # Message printed by run_op_command
+    return updated + already + replaced == len(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Update 1Password item passwords from a CSV file with the "
+        "headers: vault, item title, new password."
+    )
+    parser.add_argument("csv_file", help="Path to the CSV file")
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Fetch items in bulk per vault and run edits concurrently, "
+        "writing a per-row status CSV",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help=f"Maximum number of concurrent CLI calls in --concurrent mode (default {DEFAULT_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--sdk",
+        action="store_true",
+        help="Index, fetch and edit items with the 1Password SDK instead of the op CLI. "
+        "Implies --concurrent. Requires OP_SERVICE_ACCOUNT_TOKEN and `pip install onepassword-sdk`.",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Append-only journal of applied rows, used to skip them on a re-run "
+        "(default: the CSV path with .journal.csv in place of its extension)",
+    )
+    parser.add_argument(
+        "--status",
+        help="Path of the per-row status CSV in --concurrent mode "
+        "(default: update_status_<timestamp>.csv)",
+    )
+    args = parser.parse_args()
+
+    csv_file_path = args.csv_file
+    journal_path = args.journal or f"{os.path.splitext(csv_file_path)[0]}.journal.csv"
+    print(f"Starting 1Password item update process using CSV: {csv_file_path}")
+
+    use_sdk = args.sdk
+    if use_sdk:
+        try:
+            client = session.sdk()
+        except Exception as e:
+            print(f"Error: Failed to authenticate with the 1Password SDK: {e}", file=sys.stderr)
+            sys.exit(1)
+        if client is None:
+            print(
+                "Error: --sdk needs OP_SERVICE_ACCOUNT_TOKEN to be set and the "
+                "onepassword-sdk package (`pip install onepassword-sdk`).",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        print("Successfully connected to the 1Password SDK.")
+    else:
+        # Basic check for 'op' CLI sign-in status
+        try:
+            run_op_command(
+                ["op", "account", "list"]
+            )  # A simple command to check if op is working and signed in
+            print("Successfully connected to 1Password CLI.")
+        except subprocess.CalledProcessError as e:
+            print(
+                "Error: 1Password CLI 'op account list' command failed. "
+                "Please ensure you are signed in to the 1Password CLI.",
+                file=sys.stderr,
+            )
+            if e.stderr:
+                print(f"Details: {e.stderr.strip()}", file=sys.stderr)
+            sys.exit(1)
+        except FileNotFoundError:  # Already handled in run_op_command, but good for clarity
+            sys.exit(1)  # Message printed by run_op_command
+
+    journal = RotationJournal(journal_path)
+    if journal.done:
+        print(f"Resuming with {len(journal.done)} applied row(s) in {journal_path}")
+
+    if args.concurrent or use_sdk:
+        max_workers = max(1, args.max_workers)
+        # Back off when 1Password rate limits the concurrent edits
+        session.limiter = AdaptiveLimiter(max_workers)
+        status_path = args.status or (
+            f"update_status_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        succeeded = update_passwords_concurrently(
+            csv_file_path, max_workers, status_path, journal
+        )
+    else:
+        succeeded = update_password_from_csv(csv_file_path, journal)
+    journal.close()
 
-    if update_password_from_csv(csv_file_path):
+    if succeeded:
         print("\nPassword update process completed.")
     else:
         print("\nPassword update process completed with errors.", file=sys.stderr)
@@ -1,17 +1,20 @@
-import subprocess
+import argparse
+import asyncio
 import json
 import csv
-import threading
 import concurrent.futures
+import fnmatch
+import re
 import sys
-import itertools
-import time
 from datetime import datetime
 import os
-from typing import List, Dict, Optional
-import queue
+from typing import List, Dict, Optional, Tuple
 from tqdm import tqdm
 
+# Shared CLI/SDK session layer, one directory up.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from op_session import AdaptiveLimiter, OpSession
+
 # Script to update website fields for all items in a 1Password vault.
 # Allows selecting a vault, setting a new URL, retrying if needed, or reverting changes.
 
@@ -22,29 +25,161 @@ RED = "\033[91m"
 GREEN = "\033[92m"
 RESET = "\033[0m"
 
-# Queue for scheduling op item edit commands.
-edit_queue = queue.Queue()
-edit_thread_running = threading.Event()
-edit_errors = {}
-edit_errors_lock = threading.Lock()
+# Upper bound on concurrent item edits; override with --max-concurrency.
+DEFAULT_MAX_CONCURRENCY = 8
+
+parser = argparse.ArgumentParser(
+    description="Update the website field of every item in a 1Password vault."
+)
+parser.add_argument(
+    "--max-concurrency",
+    type=int,
+    default=DEFAULT_MAX_CONCURRENCY,
+    help=f"Maximum number of concurrent item edits (default {DEFAULT_MAX_CONCURRENCY}). "
+    "Concurrency starts lower and adapts to rate limits.",
+)
+parser.add_argument(
+    "--sdk",
+    action="store_true",
+    help="Read and write items in batches with the 1Password SDK instead of one `op item edit` per item. "
+    "Requires OP_SERVICE_ACCOUNT_TOKEN and `pip install onepassword-sdk`.",
+)
+parser.add_argument(
+    "--rules",
+    help="Run without prompts: CSV file with vault, pattern and replacement columns. Every vault whose name "
+    "or ID matches a vault glob is scanned once, and each item's website is rewritten by all matching rules "
+    "in a single edit.",
+)
+parser.add_argument(
+    "--dry-run",
+    action="store_true",
+    help="With --rules, list the changes that would be made without editing any items.",
+)
+parser.add_argument(
+    "--revert",
+    metavar="CHANGES_CSV",
+    help="Run without prompts: restore the old websites recorded in a website_changes CSV, then verify "
+    "them with one item list per vault.",
+)
+parser.add_argument(
+    "--account",
+    default=os.environ.get("OP_ACCOUNT"),
+    help="Account shorthand to sign in with when the 1Password CLI isn't authenticated "
+    "(default: the OP_ACCOUNT environment variable). Needed by --rules and --revert, which never prompt.",
+)
+parser.add_argument(
+    "--vault",
+    help="With --revert, the vault name or ID for change logs that have no VaultID column "
+    "(those written by the interactive mode).",
+)
+args = parser.parse_args()
+max_concurrency = max(1, args.max_concurrency)
+
+# Items fetched per SDK items.get_all call.
+SDK_BATCH_SIZE = 50
+
+# One 1Password session shared by every CLI call in this run. Edits start at a
+# low concurrency that grows while responses stay healthy and halves on 429s.
+session = OpSession(limiter=AdaptiveLimiter(max_concurrency))
+
+
+# Sets the website of each (item ID, URL) pair concurrently and returns errors by item ID.
+# When an item's vault is known, it is passed to `op item edit` to skip the vault lookup.
+def apply_website_edits(
+    edits: List[Tuple[str, str]], desc: str, vaults: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    errors = {}
+    vaults = vaults or {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {
+            executor.submit(
+                run_op_command,
+                ["item", "edit", item_id, f"website={url}"]
+                + (["--vault", vaults[item_id]] if item_id in vaults else []),
+            ): item_id
+            for item_id, url in edits
+        }
+        for future in tqdm(
+            concurrent.futures.as_completed(futures), total=len(futures), desc=desc, unit="item"
+        ):
+            stdout, stderr = future.result()
+            if stderr:
+                errors[futures[future]] = f"Failed to update website: {stderr}"
+    return errors
+
+# Sets an SDK item's primary website, adding or removing it as needed.
+def set_primary_website(item, url: str) -> None:
+    from onepassword import AutofillBehavior, Website
+
+    if item.websites and url:
+        item.websites[0].url = url
+    elif item.websites:
+        item.websites.pop(0)
+    elif url:
+        item.websites.append(
+            Website(url=url, label="website", autofill_behavior=AutofillBehavior.ANYWHEREONWEBSITE)
+        )
+
 
-# Thread to process edit queue with 0.5-second gaps and up to 2 concurrent edits.
-def process_edit_queue():
-    semaphore = threading.Semaphore(2)
-    while edit_thread_running.is_set():
+# Loads items with SDK items.get_all in batches, sets their websites in memory and
+# writes them back with concurrent items.put calls. Every SDK call goes through the
+# session's adaptive limiter, which backs off and retries when rate limited.
+# Returns errors by item ID.
+async def put_websites(client, vault_id: str, edits: List[Tuple[str, str]], progress) -> Dict[str, str]:
+    errors = {}
+    urls = dict(edits)
+
+    async def put(item) -> None:
+        try:
+            await session.limited(lambda: client.items.put(item))
+        except Exception as e:
+            errors[item.id] = f"Failed to update website: {e}"
+        progress.update(1)
+
+    item_ids = list(urls)
+    for start in range(0, len(item_ids), SDK_BATCH_SIZE):
+        batch = item_ids[start:start + SDK_BATCH_SIZE]
         try:
-            item_id, url = edit_queue.get_nowait()
-            with semaphore:
-                stdout, stderr = run_op_command(["item", "edit", item_id, f"website={url}"])
-                if stderr:
-                    with edit_errors_lock:
-                        edit_errors[item_id] = f"Failed to update website: {stderr}"
-                edit_queue.task_done()
-                time.sleep(0.5)
-        except queue.Empty:
-            time.sleep(0.1)
+            response = await session.limited(lambda: client.items.get_all(vault_id, batch))
         except Exception as e:
-            print(f"{RED}😕 Error in edit queue processing: {str(e)}{RESET}")
+            for item_id in batch:
+                errors[item_id] = f"Failed to retrieve item: {e}"
+            progress.update(len(batch))
+            continue
+        writes = []
+        for item_id, result in zip(batch, response.individual_responses):
+            if result.error is not None:
+                errors[item_id] = f"Failed to retrieve item: {result.error}"
+                progress.update(1)
+                continue
+            set_primary_website(result.content, urls[item_id])
+            writes.append(put(result.content))
+        await asyncio.gather(*writes)
+    return errors
+
+
+# Sets the website of each (item ID, URL) pair with the SDK and returns errors by item ID.
+def apply_website_edits_sdk(vault_id: str, edits: List[Tuple[str, str]], desc: str) -> Dict[str, str]:
+    with tqdm(total=len(edits), desc=desc, unit="item") as progress:
+        return session.call(put_websites(session.sdk(), vault_id, edits, progress))
+
+
+# Lists a vault's items with the SDK in the same shape as `op item list --format=json`.
+def list_items_sdk(vault_id: str) -> List[Dict]:
+    client = session.sdk()
+    overviews = session.call(session.limited(lambda: client.items.list(vault_id)))
+    return [
+        {
+            "id": overview.id,
+            "title": overview.title,
+            "urls": [
+                {"primary": index == 0, "href": website.url}
+                for index, website in enumerate(overview.websites)
+            ],
+        }
+        for overview in overviews
+    ]
+
 
 # Displays a table in a styled ASCII box with column separators.
 def show_table_in_box(data: List[Dict[str, str]]) -> None:
@@ -140,51 +275,285 @@ def show_table_in_box(data: List[Dict[str, str]]) -> None:
     print(f"{CYAN}{bottom_border}{RESET}")
 
 
+# Returns the primary website of an item from `op item list --format=json` output.
+def primary_website(item: Dict) -> str:
+    urls = item.get("urls") or []
+    for url in urls:
+        if url.get("primary"):
+            return url.get("href", "")
+    return urls[0].get("href", "") if urls else ""
+
+
 # Executes a 1Password CLI command and returns the output and error.
 def run_op_command(args: List[str]) -> tuple[Optional[str], Optional[str]]:
     try:
-        result = subprocess.run(
-            ["op"] + args, capture_output=True, text=True, check=True
-        )
-        return result.stdout, None
-    except subprocess.CalledProcessError as e:
-        return None, e.stderr
+        result = session.run(args)
     except FileNotFoundError:
         return None, "1Password CLI ('op') not found. Please ensure it is installed and in PATH."
+    if result.returncode != 0:
+        return None, result.stderr
+    return result.stdout, None
 
 
 # Check if user is signed into 1Password CLI and attempt sign-in if not.
-def check_op_auth() -> bool:
+def check_op_auth(account_shorthand: Optional[str] = None, interactive: bool = True) -> bool:
     stdout, stderr = run_op_command(["user", "list"])
     if stdout:
         print(f"{GREEN}✅ Already authenticated with 1Password CLI.{RESET}\n")
         return True
     print(f"{YELLOW}🔐 Looks like we need to authenticate with 1Password CLI.{RESET}")
-    account_shorthand = input(f"{YELLOW}➡️ Account shorthand (e.g., 'myaccount' for 'myaccount.1password.com'): {RESET}").strip()
-    print()
+    if not account_shorthand:
+        if not interactive:
+            print(f"{RED}😕 Not signed in to the 1Password CLI. Sign in first, or pass --account or set OP_ACCOUNT. Exiting.{RESET}\n")
+            return False
+        account_shorthand = input(f"{YELLOW}➡️ Account shorthand (e.g., 'myaccount' for 'myaccount.1password.com'): {RESET}").strip()
+        print()
     if not account_shorthand:
         print(f"{RED}😕 Account shorthand cannot be empty. Exiting.{RESET}\n")
         return False
+    signed_in, output = session.signin(account_shorthand)
+    if not signed_in:
+        print(f"{RED}😕 Failed to authenticate with 1Password CLI: {output}{RESET}\n")
+        return False
+    print(f"{GREEN}✅ Successfully authenticated with 1Password CLI.{RESET}\n")
+    return True
+
+
+# Reads a rules CSV into (vault glob, compiled URL pattern, replacement) tuples.
+def load_rules(path: str) -> List[Tuple[str, "re.Pattern", str]]:
+    rules = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [h for h in ["vault", "pattern", "replacement"] if h not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"rules file is missing columns: {', '.join(missing)}")
+        for line_num, row in enumerate(reader, 2):
+            try:
+                rules.append((row["vault"] or "*", re.compile(row["pattern"]), row["replacement"] or ""))
+            except re.error as e:
+                raise ValueError(f"line {line_num}: invalid pattern '{row['pattern']}': {e}")
+    return rules
+
+
+# Lists a vault's items once and returns a change for every item whose website the rules rewrite.
+def scan_vault(vault: Dict[str, str], rules: List[Tuple[str, "re.Pattern", str]]) -> List[Dict[str, str]]:
+    if args.sdk:
+        items = list_items_sdk(vault["id"])
+    else:
+        items_json, error = run_op_command(["item", "list", "--vault", vault["id"], "--format=json"])
+        if error:
+            raise RuntimeError(f"Failed to list items in vault '{vault['name']}': {error}")
+        items = json.loads(items_json or "[]")
+    changes = []
+    for item in items:
+        old_website = primary_website(item)
+        new_website = old_website
+        for _, pattern, replacement in rules:
+            new_website = pattern.sub(replacement, new_website)
+        if old_website and new_website != old_website:
+            changes.append({
+                "VaultID": vault["id"],
+                "VaultName": vault["name"],
+                "ItemID": item["id"],
+                "ItemTitle": item["title"],
+                "OldWebsite": old_website,
+                "NewWebsite": new_website,
+                "Error": "",
+            })
+    return changes
+
+
+# Writes the changes of several vaults with the SDK, sharing the session's limiter.
+async def put_websites_by_vault(client, edits_by_vault: Dict[str, List[Tuple[str, str]]], progress) -> Dict[str, str]:
+    results = await asyncio.gather(*[
+        put_websites(client, vault_id, edits, progress)
+        for vault_id, edits in edits_by_vault.items()
+    ])
+    return {item_id: error for errors in results for item_id, error in errors.items()}
+
+
+# Applies a rules file across every matching vault without prompting.
+def run_rules(rules_path: str) -> int:
     try:
-        process = subprocess.run(
-            ["op", "signin", "--account", account_shorthand, "--raw"],
-            capture_output=True,
-            text=True,
-            check=True
+        rules = load_rules(rules_path)
+    except (OSError, ValueError) as e:
+        print(f"{RED}😕 Couldn't read rules from {rules_path}: {e}{RESET}")
+        return 1
+
+    vaults_json, error = run_op_command(["vault", "list", "--format=json"])
+    if not vaults_json:
+        print(f"{RED}😕 Failed to list vaults: {error}{RESET}")
+        return 1
+    # Pair each vault with the rules whose glob matches its name or ID.
+    targets = []
+    for vault in json.loads(vaults_json):
+        vault_rules = [
+            rule for rule in rules
+            if fnmatch.fnmatchcase(vault["name"], rule[0]) or vault["id"] == rule[0]
+        ]
+        if vault_rules:
+            targets.append((vault, vault_rules))
+    print(f"{CYAN}🔍 Scanning {len(targets)} vaults with {len(rules)} rules...{RESET}")
+
+    changes = []
+    failed_vaults = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(scan_vault, vault, vault_rules): vault for vault, vault_rules in targets}
+        for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc="Scanning vaults", unit="vault"):
+            try:
+                changes.extend(future.result())
+            except Exception as e:
+                failed_vaults += 1
+                print(f"{RED}😕 {e}{RESET}")
+    print(f"{CYAN}🔧 {len(changes)} items to update.{RESET}")
+
+    if changes and not args.dry_run:
+        if args.sdk:
+            edits_by_vault = {}
+            for change in changes:
+                edits_by_vault.setdefault(change["VaultID"], []).append((change["ItemID"], change["NewWebsite"]))
+            with tqdm(total=len(changes), desc="Updating items", unit="item") as progress:
+                edit_errors = session.call(put_websites_by_vault(session.sdk(), edits_by_vault, progress))
+        else:
+            edit_errors = apply_website_edits(
+                [(change["ItemID"], change["NewWebsite"]) for change in changes], "Updating items"
+            )
+        for change in changes:
+            if change["ItemID"] in edit_errors:
+                change["Error"] = edit_errors[change["ItemID"]]
+                change["NewWebsite"] = ""
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = f"website_changes_{'dry_run' if args.dry_run else 'rules'}_{timestamp}.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["VaultID", "VaultName", "ItemID", "ItemTitle", "OldWebsite", "NewWebsite", "Error"]
+        )
+        writer.writeheader()
+        writer.writerows(changes)
+
+    failed = sum(1 for change in changes if change["Error"])
+    verb = "would be updated" if args.dry_run else "updated"
+    print(f"\n{CYAN}📊 {len(changes) - failed} items {verb}, {failed} failed. CSV saved at {os.path.abspath(csv_path)}.{RESET}\n")
+    return 1 if failed or failed_vaults else 0
+
+
+# Lists a vault's items (one CLI or SDK call) and returns their primary websites by item ID.
+def read_websites(vault_id: str) -> Dict[str, str]:
+    if args.sdk:
+        items = list_items_sdk(vault_id)
+    else:
+        items_json, error = run_op_command(["item", "list", "--vault", vault_id, "--format=json"])
+        if error:
+            raise RuntimeError(f"Failed to list items in vault {vault_id}: {error}")
+        items = json.loads(items_json or "[]")
+    return {item["id"]: primary_website(item) for item in items}
+
+
+# Restores the old websites from a change log without prompting, grouped by vault.
+def run_revert(changes_path: str) -> int:
+    # Stream the log, keeping only the successful changes grouped per vault.
+    reverts_by_vault = {}
+    titles = {}
+    try:
+        with open(changes_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            if "VaultID" not in (reader.fieldnames or []) and not args.vault:
+                print(f"{RED}😕 {changes_path} has no VaultID column. Pass the vault with --vault.{RESET}")
+                return 1
+            default_vault = None
+            if args.vault:
+                vaults_json, error = run_op_command(["vault", "list", "--format=json"])
+                vault = next(
+                    (v for v in json.loads(vaults_json or "[]") if args.vault in (v["name"], v["id"])), None
+                )
+                if not vault:
+                    print(f"{RED}😕 Couldn't find a vault with name or UUID '{args.vault}': {error or 'not found'}{RESET}")
+                    return 1
+                default_vault = vault["id"]
+            for row in reader:
+                if not row.get("NewWebsite"):
+                    continue
+                vault_id = row.get("VaultID") or default_vault
+                reverts_by_vault.setdefault(vault_id, {})[row["ItemID"]] = row.get("OldWebsite", "")
+                titles[row["ItemID"]] = row.get("ItemTitle", "")
+    except OSError as e:
+        print(f"{RED}😕 Couldn't read {changes_path}: {e}{RESET}")
+        return 1
+
+    total = sum(len(reverts) for reverts in reverts_by_vault.values())
+    print(f"{YELLOW}🔄 Reverting {total} items in {len(reverts_by_vault)} vaults...{RESET}")
+    if args.sdk:
+        edits_by_vault = {vault_id: list(reverts.items()) for vault_id, reverts in reverts_by_vault.items()}
+        with tqdm(total=total, desc="Reverting items", unit="item") as progress:
+            errors = session.call(put_websites_by_vault(session.sdk(), edits_by_vault, progress))
+    else:
+        errors = apply_website_edits(
+            [(item_id, url) for reverts in reverts_by_vault.values() for item_id, url in reverts.items()],
+            "Reverting items",
+            {item_id: vault_id for vault_id, reverts in reverts_by_vault.items() for item_id in reverts},
         )
-        session_token = process.stdout.strip()
-        os.environ[f"OP_SESSION_{account_shorthand}"] = session_token
-        print(f"{GREEN}✅ Successfully authenticated with 1Password CLI.{RESET}\n")
-        return True
-    except subprocess.SubprocessError as e:
-        print(f"{RED}😕 Failed to authenticate with 1Password CLI: {str(e)}{RESET}\n")
-        return False
+
+    # Verify the final state with one item list per vault.
+    # The edits are already applied, so a vault that can't be read is marked
+    # unverified instead of stopping before the result CSV is written.
+    def verify(vault_id: str) -> Tuple[Dict[str, str], str]:
+        try:
+            return read_websites(vault_id), ""
+        except Exception as e:
+            return {}, f"Could not verify: {str(e).strip()}"
+
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        current_by_vault = dict(zip(reverts_by_vault, executor.map(verify, reverts_by_vault)))
+    for vault_id, reverts in reverts_by_vault.items():
+        current, verify_error = current_by_vault[vault_id]
+        for item_id, old_website in reverts.items():
+            error = errors.get(item_id, "") or verify_error
+            if not error and current.get(item_id) != old_website:
+                error = f"Website is '{current.get(item_id, '')}' after revert"
+            results.append({
+                "VaultID": vault_id,
+                "ItemID": item_id,
+                "ItemTitle": titles[item_id],
+                "RevertedWebsite": old_website,
+                "Verified": "no" if error else "yes",
+                "Error": error,
+            })
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = f"website_revert_{timestamp}.csv"
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=["VaultID", "ItemID", "ItemTitle", "RevertedWebsite", "Verified", "Error"]
+        )
+        writer.writeheader()
+        writer.writerows(results)
+
+    failed = sum(1 for result in results if result["Error"])
+    print(f"\n{CYAN}📊 {len(results) - failed} items reverted and verified, {failed} failed. CSV saved at {os.path.abspath(csv_path)}.{RESET}\n")
+    return 1 if failed else 0
 
 
 # Verify authentication before proceeding.
-if not check_op_auth():
+if args.sdk:
+    try:
+        client = session.sdk()
+    except Exception as e:
+        print(f"{RED}😕 Failed to authenticate with the 1Password SDK: {e}{RESET}\n")
+        sys.exit(1)
+    if client is None:
+        print(f"{RED}😕 --sdk needs OP_SERVICE_ACCOUNT_TOKEN and the onepassword-sdk package (pip install onepassword-sdk).{RESET}\n")
+        sys.exit(1)
+    print(f"{GREEN}✅ Authenticated with the 1Password SDK.{RESET}\n")
+elif not check_op_auth(args.account, interactive=not (args.rules or args.revert)):
     sys.exit(1)
 
+if args.rules:
+    sys.exit(run_rules(args.rules))
+if args.revert:
+    sys.exit(run_revert(args.revert))
+
 # Prompt the user to select a vault.
 print(f"\n{CYAN}🚀 Starting website field update process...{RESET}")
 vault = None
@@ -340,117 +709,55 @@ while not confirmed:
         else:
             print(f"\n{RED}😕 Please enter 'y' or 'n'!{RESET}")
 
-    # Retrieve items from the selected vault.
-    items_json, error = run_op_command(
-        ["item", "list", "--vault", vault["id"], "--format=json"]
-    )
-    if not items_json:
-        print(
-            f"\n{YELLOW}😕 No items found in vault '{vault['name']}': {error or 'Unknown error'}.{RESET}"
+    # Retrieve items from the selected vault. The item list already carries every
+    # item's URLs, so the old website values are captured here in one call
+    # instead of one `op item get` per item.
+    if args.sdk:
+        items = list_items_sdk(vault["id"])
+        if not items:
+            print(f"\n{YELLOW}😕 No items found in vault '{vault['name']}'.{RESET}")
+            print("")
+            sys.exit(0)
+    else:
+        items_json, error = run_op_command(
+            ["item", "list", "--vault", vault["id"], "--format=json"]
         )
-        print("")
-        sys.exit(0)
-    items = json.loads(items_json)
-
-    # Initialize a thread-safe list for tracking changes.
-    changes = []
-    changes_lock = threading.Lock()
-
-    # Start the edit queue processing thread.
-    edit_thread_running.set()
-    edit_thread = threading.Thread(target=process_edit_queue)
-    edit_thread.daemon = True
-    edit_thread.start()
-
-    # Update each item’s website field using multi-threading (3 threads).
-    def update_item(
-        item: Dict[str, str],
-        new_url: str,
-        changes: List[Dict[str, str]],
-        lock: threading.Lock,
-    ) -> None:
-        error_message = ""
-        current_website = ""
-
-        # Retrieve item details in parallel.
-        item_details, error = run_op_command(["item", "get", item["id"]])
-        if not item_details:
-            error_message = f"Failed to retrieve item details: {error or 'Unknown error'}"
-            print(f"{RED}😕 Error retrieving item {item['id']} ({item['title']}): {error_message}{RESET}")
-        else:
-            # Parse the URLs section to extract the primary URL.
-            in_urls_section = False
-            for line in item_details.split("\n"):
-                if line.startswith("URLs:"):
-                    in_urls_section = True
-                    continue
-                if in_urls_section and "(primary)" in line:
-                    current_website = line.split("(primary)")[0].replace(":", "").strip()
-                    break
-                if in_urls_section and not line.startswith(":"):
-                    break
-
-            # Queue the edit command for processing.
-            edit_queue.put((item["id"], new_url))
-
-        # Add minimal delay to avoid overwhelming the queue.
-        time.sleep(0.5)
+        if not items_json:
+            print(
+                f"\n{YELLOW}😕 No items found in vault '{vault['name']}': {error or 'Unknown error'}.{RESET}"
+            )
+            print("")
+            sys.exit(0)
+        items = json.loads(items_json)
 
-        # Add the change to the thread-safe list (updated later with edit errors).
-        change = {
+    # Record each item's old website; the new URL is cleared below if its edit fails.
+    changes = [
+        {
             "ItemID": item["id"],
             "ItemTitle": item["title"],
-            "OldWebsite": current_website,
-            "NewWebsite": new_url if not error_message else "",
-            "Error": error_message,
+            "OldWebsite": primary_website(item),
+            "NewWebsite": new_url,
+            "Error": "",
         }
-        with lock:
-            changes.append(change)
+        for item in items
+    ]
 
     print("")
     print(f"{CYAN}🔧 Updating website fields for {len(items)} items...{RESET}")
 
-    # Execute updates in parallel with 3 threads.
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        futures = [
-            executor.submit(update_item, item, new_url, changes, changes_lock)
-            for item in items
-        ]
-
-        # Display progress bar and spinner.
-        spinner = itertools.cycle(["|", "/", "-", "\\"])
-        with tqdm(total=len(items), desc="Processing items", unit="item") as pbar:
-            completed_items = 0
-            while completed_items < len(items):
-                completed_items = len(changes)
-                pbar.n = completed_items
-                pbar.refresh()
-                sys.stdout.write(
-                    f"\r{CYAN}Processing items ({completed_items} of {len(items)}) {next(spinner)}{RESET}"
-                )
-                sys.stdout.flush()
-                time.sleep(0.1)
-            pbar.n = len(items)
-            pbar.refresh()
-
-    # Wait for the edit queue to empty.
-    edit_queue.join()
-
-    # Stop the edit queue processing thread.
-    edit_thread_running.clear()
-    edit_thread.join()
+    # Run the edits concurrently, bounded by the adaptive rate limiter.
+    edits = [(change["ItemID"], new_url) for change in changes]
+    if args.sdk:
+        edit_errors = apply_website_edits_sdk(vault["id"], edits, "Processing items")
+    else:
+        edit_errors = apply_website_edits(edits, "Processing items")
 
     # Update changes with edit errors.
-    with changes_lock:
-        for change in changes:
-            item_id = change["ItemID"]
-            if item_id in edit_errors:
-                change["Error"] = edit_errors[item_id]
-                change["NewWebsite"] = ""
-
-    # Clear the spinner line.
-    sys.stdout.write(f"\r{' ' * 50}\r")
-    sys.stdout.flush()
+    for change in changes:
+        item_id = change["ItemID"]
+        if item_id in edit_errors:
+            change["Error"] = edit_errors[item_id]
+            change["NewWebsite"] = ""
 
     # Save changes to a CSV file.
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -486,50 +793,20 @@ while not confirmed:
         if confirm_changes.lower() == "revert":
             print("")
             print(f"{YELLOW}🔄 Reverting changes...{RESET}")
-            completed_items = 0
-
-            # Start the edit queue processing thread for revert.
-            edit_thread_running.set()
-            edit_thread = threading.Thread(target=process_edit_queue)
-            edit_thread.daemon = True
-            edit_thread.start()
-
-            # Revert changes using multi-threading (3 threads).
-            def revert_item(change: Dict[str, str]) -> None:
-                if change["NewWebsite"]:  # Only revert if update succeeded
-                    if change["OldWebsite"]:
-                        edit_queue.put((change["ItemID"], change["OldWebsite"]))
-                    else:
-                        edit_queue.put((change["ItemID"], ""))
-                time.sleep(0.5)  # Minimal delay for queue
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                futures = [executor.submit(revert_item, change) for change in changes]
-                with tqdm(
-                    total=len(changes), desc="Reverting items", unit="item"
-                ) as pbar:
-                    while completed_items < len(changes):
-                        completed_items = len([f for f in futures if f.done()])
-                        pbar.n = completed_items
-                        pbar.refresh()
-                        sys.stdout.write(
-                            f"\r{CYAN}Reverting items ({completed_items} of {len(changes)}) {next(spinner)}{RESET}"
-                        )
-                        sys.stdout.flush()
-                        time.sleep(0.1)
-                    pbar.n = len(changes)
-                    pbar.refresh()
-
-            # Wait for the edit queue to empty.
-            edit_queue.join()
-
-            # Stop the edit queue processing thread.
-            edit_thread_running.clear()
-            edit_thread.join()
-
-            # Clear the spinner line.
-            sys.stdout.write(f"\r{' ' * 50}\r")
-            sys.stdout.flush()
+
+            # Only revert items whose update succeeded.
+            reverts = [(change["ItemID"], change["OldWebsite"]) for change in changes if change["NewWebsite"]]
+            if args.sdk:
+                revert_errors = apply_website_edits_sdk(vault["id"], reverts, "Reverting items")
+            else:
+                revert_errors = apply_website_edits(reverts, "Reverting items")
+            for item_id, error in revert_errors.items():
+                print(f"{RED}😕 Failed to revert item {item_id}: {error}{RESET}")
+
+            if revert_errors:
+                print(f"\n{YELLOW}😕 {len(revert_errors)} items could not be reverted. Old values are in {full_csv_path}.{RESET}")
+                print("")
+                sys.exit(1)
             print(f"\n{CYAN}🎉 Changes reverted successfully!{RESET}")
             print("")
             sys.exit(0)
@@ -0,0 +1,197 @@
+# Shared 1Password session layer for the Python scripts in this repository.
+#
+# One OpSession is created per run and shared by every thread. It resolves the
+# `op` binary and the signed-in account once, keeps the session token from
+# `op signin` in its own environment, pins `--account` on every call so the CLI
+# does not have to rediscover accounts, and retries rate-limited (HTTP 429)
+# calls with backoff through an optional AdaptiveLimiter.
+#
+# When OP_SERVICE_ACCOUNT_TOKEN is set and the 1Password SDK is installed
+# (`pip install onepassword-sdk`), session.sdk() returns a single authenticated
+# SDK client that runs on a background event loop; call session.call(coroutine)
+# to run an SDK coroutine from synchronous code. Only calls a script actually
+# routes through that client avoid starting an `op` process: session.run()
+# still starts one per call, and the SDK has no user management, so user
+# listing, provisioning and suspension always go through the CLI.
+#
+# Scripts in sub-directories import this module by adding this directory to
+# sys.path, so keep op_session.py next to the script folders when copying them.
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Tuple
+
+try:
+    from onepassword.client import Client
+
+    SDK_AVAILABLE: bool = True
+except ImportError:
+    SDK_AVAILABLE = False
+
+RATE_LIMIT_RETRIES: int = 5
+INTEGRATION_NAME: str = "1Password Solutions Scripts"
+INTEGRATION_VERSION: str = "v1"
+
+
+def is_rate_limited(message: str) -> bool:
+    # Check CLI or SDK error output for a 429 / rate limit response
+    message = message.lower()
+    return "429" in message or "too many requests" in message or "rate limit" in message
+
+
+class AdaptiveLimiter:
+    # Limit concurrent calls, adapting to observed latency and rate limits.
+    # The limit grows by one after a full window of healthy calls and halves
+    # when a call is rate limited or takes much longer than the running average.
+    def __init__(self, max_limit: int, initial_limit: int = 2) -> None:
+        self.max_limit: int = max_limit
+        self.limit: int = min(initial_limit, max_limit)
+        self.in_flight: int = 0
+        self.healthy_calls: int = 0
+        self.avg_latency: Optional[float] = None
+        self.condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, rate_limited: bool) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            slow: bool = self.avg_latency is not None and latency > self.avg_latency * 2
+            if rate_limited or slow:
+                self.limit = max(1, self.limit // 2)
+                self.healthy_calls = 0
+            else:
+                self.healthy_calls += 1
+                if self.healthy_calls >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.healthy_calls = 0
+            if not rate_limited:
+                self.avg_latency = latency if self.avg_latency is None else 0.8 * self.avg_latency + 0.2 * latency
+            self.condition.notify_all()
+
+
+class OpSession:
+    # A per-run 1Password CLI session with an optional SDK client
+    def __init__(
+        self,
+        account: Optional[str] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        max_retries: int = RATE_LIMIT_RETRIES,
+    ) -> None:
+        self.op_path: str = shutil.which("op") or "op"
+        self.account: Optional[str] = account or os.environ.get("OP_ACCOUNT")
+        self.env: Dict[str, str] = dict(os.environ)
+        self.limiter: Optional[AdaptiveLimiter] = limiter
+        self.max_retries: int = max_retries
+        self._client: Optional[Any] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sdk_lock = threading.Lock()
+
+    def signin(self, account: str) -> Tuple[bool, str]:
+        # Sign in once and reuse the session token for every later call
+        process = self._spawn(["signin", "--account", account, "--raw"])
+        if process.returncode != 0:
+            return False, process.stderr.strip()
+        token: str = process.stdout.strip()
+        self.account = account
+        if token:
+            # Also export it so child processes started outside the session inherit it
+            self.env[f"OP_SESSION_{account}"] = token
+            os.environ[f"OP_SESSION_{account}"] = token
+        return True, token
+
+    def _spawn(self, args: List[str], input: Optional[str] = None) -> subprocess.CompletedProcess:
+        cmd: List[str] = [self.op_path] + args
+        if self.account and args[:1] != ["signin"] and "--account" not in args:
+            cmd += ["--account", self.account]
+        # op always writes UTF-8, whatever the locale's preferred encoding is
+        return subprocess.run(
+            cmd, input=input, capture_output=True, text=True, encoding="utf-8", env=self.env, check=False
+        )
+
+    def run(self, args: List[str], input: Optional[str] = None) -> subprocess.CompletedProcess:
+        # Run an `op` command, backing off while rate limited. Never raises on a
+        # non-zero exit; raises FileNotFoundError if the CLI is not installed.
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            started: float = time.monotonic()
+            rate_limited: bool = False
+            try:
+                process = self._spawn(args, input)
+                rate_limited = process.returncode != 0 and is_rate_limited(process.stderr)
+            finally:
+                if self.limiter:
+                    self.limiter.release(time.monotonic() - started, rate_limited)
+            if not rate_limited or attempt == self.max_retries:
+                break
+            time.sleep(min(2 ** attempt, 30))
+        return process
+
+    def json(self, args: List[str], input: Optional[str] = None) -> Any:
+        # Run an `op` command with JSON output and decode it; raises CalledProcessError on failure
+        if not any(arg.startswith("--format") for arg in args):
+            args = args + ["--format=json"]
+        process = self.run(args, input)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, ["op"] + args, process.stdout, process.stderr)
+        return json.loads(process.stdout) if process.stdout.strip() else None
+
+    def sdk(self) -> Optional[Any]:
+        # Return the shared SDK client, authenticating on first use. None when the
+        # SDK is not installed or no service account token is available.
+        token: Optional[str] = os.environ.get("OP_SERVICE_ACCOUNT_TOKEN")
+        if not SDK_AVAILABLE or not token:
+            return None
+        with self._sdk_lock:
+            if self._client is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="op-sdk", daemon=True).start()
+                self._client = self.call(
+                    Client.authenticate(
+                        auth=token,
+                        integration_name=INTEGRATION_NAME,
+                        integration_version=INTEGRATION_VERSION,
+                    )
+                )
+        return self._client
+
+    def call(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        # Run an SDK coroutine on the session's event loop from any thread
+        if self._loop is None:
+            raise RuntimeError("SDK client is not initialised; call sdk() first")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def limited(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        # Await an SDK call under the session's limiter, backing off while rate
+        # limited just like run(). The limiter blocks, so it is acquired on a
+        # worker thread to keep the event loop free for the calls in flight.
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                await asyncio.get_running_loop().run_in_executor(None, self.limiter.acquire)
+            started: float = time.monotonic()
+            rate_limited: bool = False
+            try:
+                return await call()
+            except Exception as e:
+                rate_limited = is_rate_limited(str(e))
+                if not rate_limited or attempt == self.max_retries:
+                    raise
+            finally:
+                if self.limiter:
+                    self.limiter.release(time.monotonic() - started, rate_limited)
+            await asyncio.sleep(min(2 ** attempt, 30))
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._client = None
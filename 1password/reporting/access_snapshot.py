@@ -0,0 +1,343 @@
+# Builds and refreshes a local SQLite snapshot of the account's access graph:
+# users, groups, vaults, direct vault assignments, group vault assignments and
+# group memberships.
+#
+# The first run fetches everything. Later runs compare the `updated_at` value
+# of every vault, user and group against the snapshot and only re-fetch the
+# relationships of entities that changed, were added or were removed. Users
+# listed without `updated_at` are compared by a hash of their list fields, and
+# vaults or groups listed without it are always re-fetched.
+#
+# Usage:
+#   python3 access_snapshot.py --db access.db [--full]
+#
+# The reporting scripts in this directory accept `--snapshot path/to/access.db`
+# to read from the snapshot instead of querying the CLI.
+#
+# This script must be run by a member of the Owners group of a 1Password Business account
+import os
+import subprocess
+import hashlib
+import json
+import sqlite3
+import argparse
+import sys
+from datetime import datetime, timezone
+
+scriptPath = os.path.dirname(__file__)
+defaultSnapshotPath = f"{scriptPath}/access_snapshot.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS vaults (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    state TEXT,
+    type TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    last_auth_at TEXT
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    state TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS vault_users (
+    vault_id TEXT,
+    user_id TEXT,
+    permissions TEXT,
+    PRIMARY KEY (vault_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS vault_groups (
+    vault_id TEXT,
+    group_id TEXT,
+    permissions TEXT,
+    PRIMARY KEY (vault_id, group_id)
+);
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id TEXT,
+    user_id TEXT,
+    role TEXT,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS list_fingerprints (
+    id TEXT PRIMARY KEY,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS vault_users_user ON vault_users (user_id);
+CREATE INDEX IF NOT EXISTS group_members_user ON group_members (user_id);
+"""
+
+
+def runOp(args):
+    return json.loads(
+        subprocess.run(["op"] + args, check=True, capture_output=True).stdout or "[]"
+    )
+
+
+def connect(dbPath):
+    conn = sqlite3.connect(dbPath)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def openSnapshot(dbPath):
+    if not os.path.exists(dbPath):
+        sys.exit(
+            f"Snapshot {dbPath} does not exist. Build it first with: python3 access_snapshot.py --db {dbPath}"
+        )
+    return connect(dbPath)
+
+
+# `op vault list`, `op user list` and `op group list` may not include
+# `updated_at`. Rather than one `get` per entity to find it, each refresh checks
+# once whether the list has it, and falls back to the cheaper option below.
+def hasUpdatedAt(entities):
+    return all(entity.get("updated_at") for entity in entities)
+
+
+# A hash of the fields returned by the list command, used to spot changed users
+# when the list has no `updated_at`.
+def listFingerprint(entity):
+    return hashlib.sha256(json.dumps(entity, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def storedFingerprints(conn):
+    return {row["id"]: row["fingerprint"] for row in conn.execute("SELECT id, fingerprint FROM list_fingerprints")}
+
+
+def storedStamps(conn, table):
+    return {row["id"]: row["updated_at"] for row in conn.execute(f"SELECT id, updated_at FROM {table}")}
+
+
+def removeMissing(conn, table, currentIDs, relations):
+    stale = set(storedStamps(conn, table)) - currentIDs
+    for entityID in stale:
+        conn.execute(f"DELETE FROM {table} WHERE id = ?", (entityID,))
+        for relationTable, column in relations:
+            conn.execute(f"DELETE FROM {relationTable} WHERE {column} = ?", (entityID,))
+    return len(stale)
+
+
+def refreshVaults(conn, full):
+    vaults = runOp(["vault", "list", "--permission=manage_vault", "--format=json"])
+    if not full and not hasUpdatedAt(vaults):
+        # Without timestamps there is no cheap way to tell which vaults changed
+        print("vaults: the vault list has no updated_at, refreshing every vault")
+        full = True
+    stored = storedStamps(conn, "vaults")
+    changed = 0
+    for vault in vaults:
+        updatedAt = vault.get("updated_at")
+        if not full and vault["id"] in stored and stored[vault["id"]] == updatedAt:
+            continue
+        vaultUsers = runOp(["vault", "user", "list", vault["id"], "--format=json"])
+        vaultGroups = runOp(["vault", "group", "list", vault["id"], "--format=json"])
+        conn.execute("DELETE FROM vault_users WHERE vault_id = ?", (vault["id"],))
+        conn.execute("DELETE FROM vault_groups WHERE vault_id = ?", (vault["id"],))
+        conn.executemany(
+            "INSERT INTO vault_users VALUES (?, ?, ?)",
+            [(vault["id"], user["id"], json.dumps(user["permissions"])) for user in vaultUsers],
+        )
+        conn.executemany(
+            "INSERT INTO vault_groups VALUES (?, ?, ?)",
+            [(vault["id"], group["id"], json.dumps(group["permissions"])) for group in vaultGroups],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO vaults VALUES (?, ?, ?)",
+            (vault["id"], vault["name"], updatedAt),
+        )
+        conn.commit()
+        changed += 1
+    removed = removeMissing(
+        conn, "vaults", {vault["id"] for vault in vaults}, [("vault_users", "vault_id"), ("vault_groups", "vault_id")]
+    )
+    return len(vaults), changed, removed
+
+
+def refreshUsers(conn, full):
+    users = runOp(["user", "list", "--format=json"])
+    # Users are compared by updated_at when the list has it, otherwise by a
+    # fingerprint of their list fields
+    stamped = hasUpdatedAt(users)
+    stored = storedStamps(conn, "users") if stamped else storedFingerprints(conn)
+    changed = 0
+    for user in users:
+        stamp = user["updated_at"] if stamped else listFingerprint(user)
+        if not full and user["id"] in stored and stored[user["id"]] == stamp:
+            continue
+        details = runOp(["user", "get", user["id"], "--format=json"])
+        updatedAt = user.get("updated_at") or details.get("updated_at")
+        if not stamped:
+            conn.execute("INSERT OR REPLACE INTO list_fingerprints VALUES (?, ?)", (user["id"], stamp))
+        conn.execute(
+            "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user["id"],
+                user["name"],
+                user["email"],
+                user["state"],
+                user.get("type"),
+                details.get("created_at"),
+                updatedAt,
+                details.get("last_auth_at"),
+            ),
+        )
+        conn.commit()
+        changed += 1
+    removed = removeMissing(
+        conn,
+        "users",
+        {user["id"] for user in users},
+        [("vault_users", "user_id"), ("group_members", "user_id"), ("list_fingerprints", "id")],
+    )
+    return len(users), changed, removed
+
+
+def refreshGroups(conn, full):
+    groups = runOp(["group", "list", "--format=json"])
+    if not full and not hasUpdatedAt(groups):
+        # Without timestamps there is no cheap way to tell which groups changed
+        print("groups: the group list has no updated_at, refreshing every group")
+        full = True
+    stored = storedStamps(conn, "groups")
+    changed = 0
+    for group in groups:
+        updatedAt = group.get("updated_at")
+        if not full and group["id"] in stored and stored[group["id"]] == updatedAt:
+            continue
+        members = runOp(["group", "user", "list", group["id"], "--format=json"])
+        conn.execute("DELETE FROM group_members WHERE group_id = ?", (group["id"],))
+        conn.executemany(
+            "INSERT INTO group_members VALUES (?, ?, ?)",
+            [(group["id"], member["id"], member.get("role")) for member in members],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?)",
+            (group["id"], group["name"], group.get("state"), updatedAt),
+        )
+        conn.commit()
+        changed += 1
+    removed = removeMissing(
+        conn, "groups", {group["id"] for group in groups}, [("vault_groups", "group_id"), ("group_members", "group_id")]
+    )
+    return len(groups), changed, removed
+
+
+def refreshSnapshot(dbPath, full=False):
+    conn = connect(dbPath)
+    for name, refresh in (("vaults", refreshVaults), ("users", refreshUsers), ("groups", refreshGroups)):
+        total, changed, removed = refresh(conn, full)
+        print(f"{name}: {total} total, {changed} refreshed, {removed} removed")
+    conn.execute(
+        "INSERT OR REPLACE INTO meta VALUES ('refreshed_at', ?)",
+        (datetime.now(timezone.utc).isoformat(),),
+    )
+    conn.commit()
+    return conn
+
+
+# Report queries. Permissions are stored as JSON arrays and decoded here so
+# rows match what the CLI returns.
+def vaultUserRows(conn):
+    for row in conn.execute(
+        """
+        SELECT v.name AS vaultName, v.id AS vaultUUID, u.name AS userName, u.email,
+               u.id AS userUUID, u.state, vu.permissions
+        FROM vault_users vu
+        JOIN vaults v ON v.id = vu.vault_id
+        JOIN users u ON u.id = vu.user_id
+        ORDER BY v.name, u.name
+        """
+    ):
+        yield dict(row, permissions=json.loads(row["permissions"]))
+
+
+def vaultGroupRows(conn):
+    for row in conn.execute(
+        """
+        SELECT v.name AS vaultName, v.id AS vaultUUID, g.name AS groupName,
+               g.id AS groupUUID, vg.permissions
+        FROM vault_groups vg
+        JOIN vaults v ON v.id = vg.vault_id
+        JOIN groups g ON g.id = vg.group_id
+        ORDER BY v.name, g.name
+        """
+    ):
+        yield dict(row, permissions=json.loads(row["permissions"]))
+
+
+def vaultGroupMemberRows(conn):
+    for row in conn.execute(
+        """
+        SELECT v.name AS vaultName, v.id AS vaultUUID, u.name AS userName, u.email,
+               u.id AS userUUID, u.state, g.name AS groupName, vg.permissions
+        FROM vault_groups vg
+        JOIN vaults v ON v.id = vg.vault_id
+        JOIN groups g ON g.id = vg.group_id
+        JOIN group_members gm ON gm.group_id = vg.group_id
+        JOIN users u ON u.id = gm.user_id
+        ORDER BY v.name, g.name, u.name
+        """
+    ):
+        yield dict(row, permissions=json.loads(row["permissions"]))
+
+
+def userRows(conn):
+    vaultsByUser = {}
+    for row in conn.execute(
+        "SELECT vu.user_id, v.name, v.id FROM vault_users vu JOIN vaults v ON v.id = vu.vault_id ORDER BY v.name"
+    ):
+        vaultsByUser.setdefault(row["user_id"], []).append((row["name"], row["id"]))
+    groupsByUser = {}
+    for row in conn.execute(
+        "SELECT gm.user_id, g.name, g.id FROM group_members gm JOIN groups g ON g.id = gm.group_id ORDER BY g.name"
+    ):
+        groupsByUser.setdefault(row["user_id"], []).append((row["name"], row["id"]))
+    for row in conn.execute("SELECT * FROM users ORDER BY name"):
+        yield dict(
+            row,
+            vaults=vaultsByUser.get(row["id"], []),
+            groups=groupsByUser.get(row["id"], []),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        "Access Graph Snapshot",
+        "Builds or incrementally refreshes a SQLite snapshot of users, groups, vaults and their permissions.",
+    )
+    parser.add_argument(
+        "--db",
+        action="store",
+        dest="dbPath",
+        default=defaultSnapshotPath,
+        help="Path to the SQLite snapshot file. Defaults to access_snapshot.db next to this script.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore updated_at timestamps and re-fetch every relationship.",
+    )
+    args = parser.parse_args()
+    try:
+        refreshSnapshot(args.dbPath, full=args.full)
+    except subprocess.CalledProcessError as e:
+        sys.exit(f"Unable to refresh the snapshot. Error: {e.stderr.decode('utf-8', 'replace') if e.stderr else e}")
+    print(f"Snapshot written to {os.path.abspath(args.dbPath)}")
+
+
+if __name__ == "__main__":
+    main()
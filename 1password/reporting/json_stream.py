@@ -0,0 +1,48 @@
+# Incremental parsing of the JSON arrays printed by `op ... --format=json`,
+# used by user-and-item-list.py to stream large item lists.
+import json
+
+# Characters that can continue a JSON number
+NUMBER_CHARS = set("0123456789.eE+-")
+
+
+def isNumber(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Yield each element of a JSON array as it is read from a stream, so a vault's
+# item list never has to be held in memory all at once.
+def iterJSONArray(stream, chunkSize=65536):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    while True:
+        chunk = stream.read(chunkSize)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # the value continues in the next chunk
+            if chunk and (end == len(buffer) or (isNumber(value) and buffer[end] in NUMBER_CHARS)):
+                break  # a number may continue in the next chunk, e.g. "1" of "1.5"
+            position = end
+            yield value
+        if not chunk:
+            return
@@ -0,0 +1,27 @@
+# Checks that iterJSONArray parses op output correctly however it is chunked.
+import io
+import json
+
+import json_stream
+
+SAMPLE = '[1.5, -2, 3e10, -4.25E-3, 1.5e+10, 0, true, null, "a,]b", {"id": "x", "n": [1.5, 2]}, [], 12345678901234567890]'
+
+
+def test_whole_stream():
+    assert list(json_stream.iterJSONArray(io.StringIO(SAMPLE))) == json.loads(SAMPLE)
+
+
+def test_every_chunk_size():
+    expected = json.loads(SAMPLE)
+    for chunkSize in range(1, len(SAMPLE) + 2):
+        assert list(json_stream.iterJSONArray(io.StringIO(SAMPLE), chunkSize)) == expected, chunkSize
+
+
+def test_number_split_across_chunks():
+    assert list(json_stream.iterJSONArray(io.StringIO("[1.5]"), 1)) == [1.5]
+    for chunkSize in (1, 3):
+        assert list(json_stream.iterJSONArray(io.StringIO("[1.5e10]"), chunkSize)) == [1.5e10]
+
+
+def test_empty_array():
+    assert list(json_stream.iterJSONArray(io.StringIO("[]"), 1)) == []
@@ -2,9 +2,64 @@ import os
 import subprocess
 import csv
 import json
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+parser = argparse.ArgumentParser(
+    "User Access List Generator",
+    "Generates a csv-like report of every user, their directly assigned vaults and their groups.",
+)
+parser.add_argument(
+    "--snapshot",
+    action="store",
+    dest="snapshotPath",
+    help="Read from an access graph snapshot built by access_snapshot.py instead of querying the CLI.",
+)
+parser.add_argument(
+    "--workers",
+    action="store",
+    dest="workers",
+    type=int,
+    default=5,
+    help="Number of users to fetch concurrently. Defaults to 5.",
+)
+parser.add_argument(
+    "--checkpoint",
+    action="store",
+    dest="checkpointPath",
+    help="Path to the checkpoint file used to resume an interrupted run. Defaults to user_access_list.checkpoint.jsonl next to this script.",
+)
+parser.add_argument(
+    "--fresh",
+    action="store_true",
+    dest="fresh",
+    help="Ignore any existing checkpoint and fetch every user again.",
+)
+parser.add_argument(
+    "--checkpoint-max-age",
+    action="store",
+    dest="checkpointMaxAge",
+    type=float,
+    default=24,
+    help="Hours after which a checkpointed user is considered stale and fetched again. Defaults to 24.",
+)
+parser.add_argument(
+    "--vault-index",
+    action="store",
+    dest="vaultIndex",
+    choices=["auto", "user", "vault"],
+    default="auto",
+    help="How to find each user's directly assigned vaults: 'user' runs one `op vault list --user` per user, 'vault' runs one `op vault user list` per vault and inverts the result. 'auto' (default) picks whichever needs fewer calls.",
+)
+args = parser.parse_args()
 
 scriptPath = os.path.dirname(__file__)
 outputPath = scriptPath
+checkpointPath = args.checkpointPath or f"{outputPath}/user_access_list.checkpoint.jsonl"
+maxRetries = 5
 
 
 class User:
@@ -23,42 +78,111 @@ class User:
         self.vaults = vaults
 
 
+# Run an op command and parse its JSON output. Rate limited (429) calls are
+# retried with exponential backoff, anything else fails immediately.
+def runOp(args):
+    for attempt in range(maxRetries + 1):
+        result = subprocess.run(["op"] + args, capture_output=True)
+        if result.returncode == 0:
+            return json.loads(result.stdout)
+        stderr = result.stderr.decode("utf-8", "replace").lower()
+        rateLimited = "429" in stderr or "too many requests" in stderr or "rate limit" in stderr
+        if not rateLimited or attempt == maxRetries:
+            raise subprocess.CalledProcessError(
+                result.returncode, ["op"] + args, result.stdout, result.stderr
+            )
+        time.sleep(min(2**attempt, 30) + random.random())
+
+
 def getAllUsers():
-    return json.loads(
-        subprocess.run(
-            ["op", "user", "list", "--format=json"], check=True, capture_output=True
-        ).stdout
-    )
+    return runOp(["user", "list", "--format=json"])
 
 
 def getUserInfo(userUUID):
-    return json.loads(
-        subprocess.run(
-            ["op", "user", "get", userUUID, "--format=json"],
-            check=True,
-            capture_output=True,
-        ).stdout
-    )
+    return runOp(["user", "get", userUUID, "--format=json"])
 
 
 def getUserVaults(userUUID):
-    return json.loads(
-        subprocess.run(
-            ["op", "vault", "list", f"--user={userUUID}", "--format=json"],
-            check=True,
-            capture_output=True,
-        ).stdout
-    )
+    return runOp(["vault", "list", f"--user={userUUID}", "--format=json"])
 
 
 def getUserGroups(userUUID):
-    return json.loads(
-        subprocess.run(
-            ["op", "group", "list", f"--user={userUUID}", "--format=json"],
-            check=True,
-            capture_output=True,
-        ).stdout
-    )
+    return runOp(["group", "list", f"--user={userUUID}", "--format=json"])
+
+
+def getAllOwnerVaults():
+    return runOp(["vault", "list", "--permission=manage_vault", "--format=json"])
+
+
+def getAllVaults():
+    return runOp(["vault", "list", "--format=json"])
+
+
+def getVaultUsers(vaultID):
+    return runOp(["vault", "user", "list", vaultID, "--format=json"])
+
+
+# Build a user UUID -> [(vaultName, vaultUUID)] index by listing the users of
+# each vault once. Only vaults the signed-in user can manage are included, so
+# run this as a member of the Owners group.
+def buildVaultIndex(vaults):
+    vaultIndex = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {executor.submit(getVaultUsers, vault["id"]): vault for vault in vaults}
+        for future in as_completed(futures):
+            vault = futures[future]
+            for user in future.result():
+                vaultIndex.setdefault(user["id"], []).append((vault["name"], vault["id"]))
+    for userVaults in vaultIndex.values():
+        userVaults.sort()
+    return vaultIndex
+
+
+# Fetch everything the report needs for a single user. When a vault index is
+# provided the user's vaults are read from it instead of the CLI.
+def fetchUser(user, vaultIndex=None):
+    userData = getUserInfo(user["id"])
+    userGroups = getUserGroups(user["id"])
+    groups = [(group["name"], group["id"]) for group in userGroups]
+    if vaultIndex is None:
+        vaults = [(vault["name"], vault["id"]) for vault in getUserVaults(user["id"])]
+    else:
+        vaults = vaultIndex.get(user["id"], [])
+    return {
+        "name": user["name"],
+        "email": user["email"],
+        "uuid": user["id"],
+        "state": user["state"],
+        "type": user["type"],
+        "createdAt": userData["created_at"],
+        "updatedAt": userData["updated_at"],
+        "lastAuthAt": userData["last_auth_at"],
+        "groups": str(groups).removeprefix("[").removesuffix("]"),
+        "vaults": str(vaults).removeprefix("[").removesuffix("]"),
+    }
+
+
+# Users already fetched by a previous, interrupted run. Records older than
+# --checkpoint-max-age hours, or written without a timestamp, are fetched again.
+def loadCheckpoint():
+    completed = {}
+    if args.fresh or not os.path.exists(checkpointPath):
+        return completed
+    oldest = time.time() - args.checkpointMaxAge * 3600
+    stale = 0
+    with open(checkpointPath, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a partially written last line
+            if record.pop("checkpointedAt", 0) < oldest:
+                stale += 1
+                continue
+            completed[record["uuid"]] = record
+    if stale:
+        print(f"Ignoring {stale} checkpointed user(s) older than {args.checkpointMaxAge:g} hours")
+    return completed
 
 
 def writeReport(users):
@@ -95,35 +219,94 @@ def writeReport(users):
             )
 
 
+def getSnapshotUsers(snapshotPath):
+    import access_snapshot
+
+    conn = access_snapshot.openSnapshot(snapshotPath)
+    return [
+        User(
+            name=user["name"],
+            email=user["email"],
+            uuid=user["id"],
+            state=user["state"],
+            type=user["type"],
+            createdAt=user["created_at"],
+            updatedAt=user["updated_at"],
+            lastAuthAt=user["last_auth_at"],
+            groups=str(user["groups"]).removeprefix("[").removesuffix("]"),
+            vaults=str(user["vaults"]).removeprefix("[").removesuffix("]"),
+        )
+        for user in access_snapshot.userRows(conn)
+    ]
+
+
 def main():
+    if args.snapshotPath is not None:
+        writeReport(getSnapshotUsers(args.snapshotPath))
+        return
+
     rawUsers = getAllUsers()
-    accountUsers = []
     usercount = len(rawUsers)
-    counter = 1
-    for user in rawUsers:
-        print(f"Processing user {counter}/{usercount}")
-        userData = getUserInfo(user["id"])
-        userGroups = getUserGroups(user["id"])
-        userVaults = getUserVaults(user["id"])
-        groups = [(group["name"], group["id"]) for group in userGroups]
-        vaults = [(vault["name"], vault["id"]) for vault in userVaults]
-        accountUsers.append(
-            User(
-                name=user["name"],
-                email=user["email"],
-                uuid=user["id"],
-                state=user["state"],
-                type=user["type"],
-                createdAt=userData["created_at"],
-                updatedAt=userData["updated_at"],
-                lastAuthAt=userData["last_auth_at"],
-                groups=str(groups).removeprefix("[").removesuffix("]"),
-                vaults=str(vaults).removeprefix("[").removesuffix("]"),
-            )
+    completed = loadCheckpoint()
+    pending = [user for user in rawUsers if user["id"] not in completed]
+    if completed:
+        print(f"Resuming from checkpoint: {usercount - len(pending)}/{usercount} users already processed")
+
+    # Listing vault users costs one call per vault plus the vault list itself,
+    # listing user vaults costs one call per pending user.
+    vaultIndex = None
+    if pending and args.vaultIndex != "user":
+        vaults = getAllOwnerVaults()
+        if args.vaultIndex == "vault" or len(vaults) + 2 < len(pending):
+            # The index only sees vaults the signed-in user can manage, so
+            # check it covers every vault they can see before relying on it
+            uncovered = {vault["id"] for vault in getAllVaults()} - {vault["id"] for vault in vaults}
+            if uncovered and args.vaultIndex == "auto":
+                print(
+                    f"Warning: {len(uncovered)} vault(s) can't be managed by the signed-in user, "
+                    "so listing vaults per user instead of indexing vault access"
+                )
+            else:
+                if uncovered:
+                    print(
+                        f"Warning: {len(uncovered)} vault(s) can't be managed by the signed-in user "
+                        "and are missing from directlyAssignedVaults"
+                    )
+                print(f"Indexing vault access from {len(vaults)} vaults instead of {len(pending)} users")
+                vaultIndex = buildVaultIndex(vaults)
+
+    failures = 0
+    # A fresh run starts a new checkpoint rather than appending to the old one
+    with open(checkpointPath, "w" if args.fresh else "a", encoding="utf-8") as checkpointFile:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {executor.submit(fetchUser, user, vaultIndex): user for user in pending}
+            for future in as_completed(futures):
+                user = futures[future]
+                try:
+                    record = future.result()
+                except subprocess.CalledProcessError as e:
+                    failures += 1
+                    print(f"Unable to process user {user['email']}. Error: {e.stderr.decode('utf-8', 'replace').strip()}")
+                    continue
+                except Exception as e:
+                    failures += 1
+                    print(f"Unable to process user {user['email']}. Error: {e!r}")
+                    continue
+                completed[record["uuid"]] = record
+                # Results are handled on the main thread only, so no lock is needed
+                checkpointFile.write(json.dumps({**record, "checkpointedAt": time.time()}) + "\n")
+                checkpointFile.flush()
+                print(f"Processed user {len(completed)}/{usercount}", end="\r")
+    print()
+
+    if failures:
+        sys.exit(
+            f"{failures} user(s) could not be processed. Run the script again to retry them; completed users are saved in {checkpointPath}."
         )
-        counter += 1
 
+    accountUsers = [User(**completed[user["id"]]) for user in rawUsers]
     writeReport(accountUsers)
+    os.remove(checkpointPath)
 
 
 main()
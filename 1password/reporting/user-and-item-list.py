@@ -5,6 +5,20 @@ import subprocess
 import csv
 import json
 import argparse
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from json_stream import iterJSONArray
+
+# pyarrow is only needed for --output-format parquet
+try:
+    import pyarrow
+    import pyarrow.parquet
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 parser = argparse.ArgumentParser(
     "User and Items Report Generator",
@@ -16,6 +30,22 @@ parser.add_argument(
     dest="filepath",
     help="Specify a path to a file containing a line-deliminted list of vault UUIDs to include in the report.",
 )
+parser.add_argument(
+    "--workers",
+    action="store",
+    dest="workers",
+    type=int,
+    default=1,
+    help="Process this many vaults concurrently. With more than one worker, temporary view_items grants are made up front and always revoked at the end, even if the script is interrupted.",
+)
+parser.add_argument(
+    "--output-format",
+    action="store",
+    dest="outputFormat",
+    choices=["report", "csv", "parquet"],
+    default="report",
+    help="'report' (default) writes the single vault-item-report.csv. 'csv' and 'parquet' stream normalized vaults, users, vault_users and items tables into the vault-item-report directory, writing each table in batches of 10000 rows.",
+)
 args = parser.parse_args()
 
 scriptPath = os.path.dirname(__file__)
@@ -97,62 +127,283 @@ def getVaultItems(vaultID):
     return vaultItemList
 
 
+def streamVaultItems(vaultID):
+    process = subprocess.Popen(
+        ["op", "item", "list", f"--vault={vaultID}", "--format=json"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    # Drain stderr on a thread so a chatty op can't block writing to a full pipe
+    stderr = []
+    drain = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    drain.start()
+    try:
+        yield from iterJSONArray(process.stdout)
+    except ValueError:
+        # Malformed output usually means op failed, so report its error if it did
+        process.stdout.close()
+        if process.wait() != 0:
+            drain.join()
+            raise subprocess.CalledProcessError(process.returncode, process.args, None, "".join(stderr))
+        raise
+    except BaseException:
+        # The consumer stopped early or failed: stop op and keep the original exception
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+        drain.join()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args, None, "".join(stderr))
+
+
+# Writes the report as normalized tables (vaults, users, vault_users, items)
+# in CSV or Parquet. Rows are buffered per table and flushed every
+# `batchSize` rows, so memory use stays flat regardless of vault size.
+# Safe to call from several threads.
+class TableWriter:
+    tables = {
+        "vaults": ["vaultUUID", "vaultName", "itemCount"],
+        "users": ["userUUID", "userName", "userEmail"],
+        "vault_users": ["vaultUUID", "userUUID", "userPermissions"],
+        "items": ["vaultUUID", "itemUUID", "itemName"],
+    }
+
+    def __init__(self, directory, outputFormat, batchSize=10000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.outputFormat = outputFormat
+        self.batchSize = batchSize
+        self.lock = threading.Lock()
+        self.seenUsers = set()
+        self.buffers = {table: [] for table in self.tables}
+        self.files = {}
+        self.writers = {}
+        for table, columns in self.tables.items():
+            path = f"{directory}/{table}.{outputFormat}"
+            if outputFormat == "parquet":
+                schema = pyarrow.schema(
+                    [
+                        (column, pyarrow.int64() if column == "itemCount" else pyarrow.string())
+                        for column in columns
+                    ]
+                )
+                self.writers[table] = pyarrow.parquet.ParquetWriter(path, schema)
+            else:
+                self.files[table] = open(path, "w", newline="")
+                self.writers[table] = csv.writer(self.files[table])
+                self.writers[table].writerow(columns)
+
+    def flush(self, table):
+        rows = self.buffers[table]
+        if not rows:
+            return
+        if self.outputFormat == "parquet":
+            columns = self.tables[table]
+            self.writers[table].write_table(
+                pyarrow.Table.from_pydict(
+                    {column: [row[i] for row in rows] for i, column in enumerate(columns)},
+                    schema=self.writers[table].schema,
+                )
+            )
+        else:
+            self.writers[table].writerows(rows)
+        self.buffers[table] = []
+
+    def addRows(self, table, rows):
+        with self.lock:
+            self.buffers[table].extend(rows)
+            if len(self.buffers[table]) >= self.batchSize:
+                self.flush(table)
+
+    def writeVault(self, vault, vaultUserList, items):
+        with self.lock:
+            newUsers = [user for user in vaultUserList if user["id"] not in self.seenUsers]
+            self.seenUsers.update(user["id"] for user in newUsers)
+        self.addRows("users", [(user["id"], user["name"], user["email"]) for user in newUsers])
+        self.addRows(
+            "vault_users",
+            [(vault["id"], user["id"], ",".join(user["permissions"])) for user in vaultUserList],
+        )
+        itemCount = 0
+        batch = []
+        for item in items:
+            batch.append((vault["id"], item["id"], item["title"]))
+            itemCount += 1
+            if len(batch) >= self.batchSize:
+                self.addRows("items", batch)
+                batch = []
+        self.addRows("items", batch)
+        self.addRows("vaults", [(vault["id"], vault["name"], itemCount)])
+        print(vault["name"], vault["id"], f"{itemCount} items")
+
+    def close(self):
+        with self.lock:
+            for table in self.tables:
+                self.flush(table)
+                if self.outputFormat == "parquet":
+                    self.writers[table].close()
+                else:
+                    self.files[table].close()
+
+
+def grantViewPermission(vaultUUID):
+    subprocess.run(
+        [
+            f"op vault user grant --user={myUUID} --vault={vaultUUID} --permissions=view_items"
+        ],
+        shell=True,
+        check=True,
+        capture_output=True,
+    )
+
+
+def revokeViewPermission(vaultUUID):
+    subprocess.run(
+        [
+            f"op vault user revoke --user={myUUID} --vault={vaultUUID} --permissions=view_items"
+        ],
+        shell=True,
+        check=True,
+        capture_output=True,
+    )
+
+
+# check whether the Owner needs View Item permission for a vault
+def needsViewPermission(vaultUserData):
+    myData = next((user for user in vaultUserData if user["id"] == myUUID), None)
+    return myData is None or "view_items" not in myData["permissions"]
+
+
 # check the Owner's permissions for a vault. Add View Item permission if not granted
 def addViewPermissions(vaultUserData, vaultUUID):
-    myData = next((user for user in vaultUserData if user["id"] == myUUID), None)
-    if myData is None:
-        subprocess.run(
-            [
-                f"op vault user grant --user={myUUID} --vault={vaultUUID} --permissions=view_items"
-            ],
-            shell=True,
-            check=True,
-            capture_output=True,
-        )
+    if needsViewPermission(vaultUserData):
+        grantViewPermission(vaultUUID)
         print(f"View permission for {vaultUUID} granted")
         return True
-    elif myData is not None:
-        permissions = myData["permissions"]
-        if "view_items" not in permissions:
-            subprocess.run(
-                [
-                    f"op vault user grant --user={myUUID} --vault={vaultUUID} --permissions=view_items"
-                ],
-                shell=True,
-                check=True,
-                capture_output=True,
-            )
-            print(f"view permission for {vaultUUID} granted")
-            return True
-    else:
-        return
 
 
 # remove the View Item permission.
 def removeViewPermissions(vaultUserData, vaultUUID):
-    myData = next((user for user in vaultUserData if user["id"] == myUUID), None)
-    if myData is None:
-        subprocess.run(
+    if needsViewPermission(vaultUserData):
+        revokeViewPermission(vaultUUID)
+        print(f"View permission for vault {vaultUUID} revoked")
+
+
+def writeVault(csvWriter, vault, vaultUserList, itemList):
+    csvWriter.writerow(
+        [vault["name"], vault["id"], None, None, None, None, None, None]
+    )
+    print(vault["name"], vault["id"])
+
+    for user in vaultUserList:
+        csvWriter.writerow(
             [
-                f"op vault user revoke --user={myUUID} --vault={vaultUUID} --permissions=view_items"
-            ],
-            shell=True,
-            check=True,
-            capture_output=True,
+                None,
+                None,
+                user["name"],
+                user["email"],
+                user["id"],
+                user["permissions"],
+                None,
+                None,
+            ]
         )
-        print(f"View permission for vault {vaultUUID} revoked")
-    elif myData is not None:
-        permissions = myData["permissions"]
-        if "view_items" not in permissions:
-            subprocess.run(
-                [
-                    f"op vault user revoke --user={myUUID} --vault={vaultUUID} --permissions=view_items"
-                ],
-                shell=True,
-                check=True,
-                capture_output=True,
-            )
-            print(f"View permission for vault {vaultUUID} revoked")
+        print(user["name"], user["email"], user["id"], user["permissions"])
+
+    for item in itemList:
+        csvWriter.writerow(
+            [None, None, None, None, None, None, item["title"], item["id"]]
+        )
+        print(item["title"], item["id"])
+
+
+# Raise KeyboardInterrupt on SIGTERM so the cleanup phase also runs when the
+# script is stopped by a process manager.
+def handleTerminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+# Process every vault concurrently in three phases: grant view_items wherever
+# it is missing, list items, then revoke every grant this run made. The revoke
+# phase runs even if listing fails or the script is interrupted.
+def processVaultsConcurrently(vaultList, emitVault):
+    granted = set()
+    grantedLock = threading.Lock()
+
+    # A grant whose op process was killed by Ctrl-C may still have been
+    # applied, so it stays in the revoke set unless op reported a failure.
+    def grant(vaultUUID):
+        with grantedLock:
+            granted.add(vaultUUID)
+        try:
+            grantViewPermission(vaultUUID)
+        except subprocess.CalledProcessError as e:
+            if e.returncode > 0:
+                with grantedLock:
+                    granted.discard(vaultUUID)
+            raise
+
+    previousHandler = signal.signal(signal.SIGTERM, handleTerminate)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        userFutures = {
+            executor.submit(getVaultUserList, vault["id"]): vault for vault in vaultList
+        }
+        vaultUsers = {}
+        for future in as_completed(userFutures):
+            vaultUsers[userFutures[future]["id"]] = json.loads(future.result())
+
+        needsGrant = [
+            vault for vault in vaultList if needsViewPermission(vaultUsers[vault["id"]])
+        ]
+        print(f"Granting temporary view permission for {len(needsGrant)} vault(s)")
+        grantFutures = {executor.submit(grant, vault["id"]): vault for vault in needsGrant}
+        for future in as_completed(grantFutures):
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                print(
+                    f"ERR: Unable to grant view permission for vault {grantFutures[future]['id']}. Error: ",
+                    e,
+                )
+
+        itemFutures = {
+            executor.submit(emitVault, vault, vaultUsers[vault["id"]]): vault
+            for vault in vaultList
+        }
+        for future in as_completed(itemFutures):
+            try:
+                future.result()
+            except Exception as e:
+                print(
+                    f"ERR: Unable to list items in vault {itemFutures[future]['id']}. It's possible the 1Password CLI has been removed from the 'App Access' list for this vault. Error: ",
+                    e,
+                )
+    finally:
+        # Ignore further interrupts until cleanup is done. Let in-flight calls
+        # finish so every grant is recorded, but drop anything not yet started.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        executor.shutdown(wait=True, cancel_futures=True)
+        print(f"Revoking temporary view permission for {len(granted)} vault(s)")
+        with ThreadPoolExecutor(max_workers=args.workers) as cleanup:
+            revokeFutures = {
+                cleanup.submit(revokeViewPermission, vaultUUID): vaultUUID
+                for vaultUUID in granted
+            }
+            for future in as_completed(revokeFutures):
+                try:
+                    future.result()
+                except subprocess.CalledProcessError as e:
+                    print(
+                        f"ERR: Unable to revoke view permission for vault {revokeFutures[future]}. Revoke it manually. Error: ",
+                        e,
+                    )
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, previousHandler)
 
 
 def main():
@@ -167,67 +418,77 @@ def main():
     else:
         vaultList = getSpecifiedVaults()
 
-    with open(f"{outputPath}/vault-item-report.csv", "w", newline="") as outputFile:
-        csvWriter = csv.writer(outputFile)
-        fields = [
-            "vaultName",
-            "vaultUUD",
-            "userName",
-            "userEmail",
-            "userUUID",
-            "userPermissions",
-            "itemName",
-            "itemUUID",
-        ]
-        csvWriter.writerow(fields)
+    # skip your own Private vault and Private vaults of pending users
+    vaultList = [
+        vault
+        for vault in vaultList
+        if not ("Private Vault" in vault["name"] or vault["name"] == "Private")
+    ]
 
-        for vault in vaultList:
-            permissionsModified = False
-            if (
-                "Private Vault" in vault["name"] or vault["name"] == "Private"
-            ):  # skip your own Private vault and Private vaults of pending users
-                continue
-            vaultUserList = json.loads(getVaultUserList(vault["id"]))
-            permissionsModified = addViewPermissions(vaultUserList, vault["id"])
+    if args.outputFormat == "report":
+        with open(f"{outputPath}/vault-item-report.csv", "w", newline="") as outputFile:
+            csvWriter = csv.writer(outputFile)
+            fields = [
+                "vaultName",
+                "vaultUUD",
+                "userName",
+                "userEmail",
+                "userUUID",
+                "userPermissions",
+                "itemName",
+                "itemUUID",
+            ]
+            csvWriter.writerow(fields)
+            writeLock = threading.Lock()
 
-            try:
+            def emitVault(vault, vaultUserList):
                 itemList = json.loads(getVaultItems(vault["id"]))
-            except Exception as e:
-                print(
-                    f"ERR: Unable to list items in vault {vault['id']}. It's possible the 1Password CLI has been removed from the 'App Access' list for this vault. Error: ",
-                    e,
-                )
-                continue
+                with writeLock:
+                    writeVault(csvWriter, vault, vaultUserList, itemList)
 
-            csvWriter.writerow(
-                [vault["name"], vault["id"], None, None, None, None, None, None]
+            processVaults(vaultList, emitVault)
+    else:
+        if args.outputFormat == "parquet" and not PYARROW_AVAILABLE:
+            sys.exit(
+                "Parquet output requires pyarrow. Install it with 'pip install pyarrow' or use --output-format csv."
+            )
+        tableWriter = TableWriter(f"{outputPath}/vault-item-report", args.outputFormat)
+        try:
+            processVaults(
+                vaultList,
+                lambda vault, vaultUserList: tableWriter.writeVault(
+                    vault, vaultUserList, streamVaultItems(vault["id"])
+                ),
             )
-            print(vault["name"], vault["id"])
+        finally:
+            tableWriter.close()
 
-            for user in vaultUserList:
-                csvWriter.writerow(
-                    [
-                        None,
-                        None,
-                        user["name"],
-                        user["email"],
-                        user["id"],
-                        user["permissions"],
-                        None,
-                        None,
-                    ]
-                )
-                print(user["name"], user["email"], user["id"], user["permissions"])
 
-            for item in itemList:
-                csvWriter.writerow(
-                    [None, None, None, None, None, None, item["title"], item["id"]]
-                )
-                print(item["title"], item["id"])
-            if (
-                permissionsModified == True
-            ):  # if permission was added, remove the permission
-                removeViewPermissions(vaultUserList, vault["id"])
+def processVaults(vaultList, emitVault):
+    if args.workers > 1:
+        try:
+            processVaultsConcurrently(vaultList, emitVault)
+        except KeyboardInterrupt:
+            sys.exit("Interrupted. The report is incomplete.")
+        return
+
+    for vault in vaultList:
+        permissionsModified = False
+        vaultUserList = json.loads(getVaultUserList(vault["id"]))
+        permissionsModified = addViewPermissions(vaultUserList, vault["id"])
+
+        try:
+            emitVault(vault, vaultUserList)
+        except Exception as e:
+            print(
+                f"ERR: Unable to list items in vault {vault['id']}. It's possible the 1Password CLI has been removed from the 'App Access' list for this vault. Error: ",
+                e,
+            )
+            continue
 
+        if (
+            permissionsModified == True
+        ):  # if permission was added, remove the permission
+            removeViewPermissions(vaultUserList, vault["id"])
 
 main()
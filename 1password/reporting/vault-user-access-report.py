@@ -16,6 +16,12 @@ parser.add_argument(
     dest="filepath",
     help="Specify a path to a file containing a line-deliminted list of vault UUIDs to include in the report.",
 )
+parser.add_argument(
+    "--snapshot",
+    action="store",
+    dest="snapshotPath",
+    help="Read from an access graph snapshot built by access_snapshot.py instead of querying the CLI.",
+)
 args = parser.parse_args()
 
 scriptPath = os.path.dirname(__file__)
@@ -79,9 +85,63 @@ def getVaultGroupList(vaultID):
     return vaultGroupList
 
 
+# Write the report from an access graph snapshot instead of the CLI.
+def writeSnapshotReport(csvWriter, vaultIDs):
+    import access_snapshot
+
+    conn = access_snapshot.openSnapshot(args.snapshotPath)
+    for user in access_snapshot.vaultUserRows(conn):
+        if vaultIDs is None or user["vaultUUID"] in vaultIDs:
+            csvWriter.writerow(
+                [
+                    user["vaultName"],
+                    user["vaultUUID"],
+                    user["userName"],
+                    None,
+                    user["email"],
+                    user["userUUID"],
+                    user["permissions"],
+                ]
+            )
+    for group in access_snapshot.vaultGroupRows(conn):
+        if vaultIDs is None or group["vaultUUID"] in vaultIDs:
+            csvWriter.writerow(
+                [
+                    group["vaultName"],
+                    group["vaultUUID"],
+                    None,
+                    group["groupName"],
+                    None,
+                    group["groupUUID"],
+                    group["permissions"],
+                ]
+            )
+
+
 # Given a list of vaults, for each vault, list the users that have access along with their permissions.
 # Write the results to a csv file with columns: "vaultName", "vaultUUID", "name","email", "userUUID", "permissions"
 def main():
+    if args.snapshotPath is not None:
+        vaultIDs = None
+        if inputFilePath is not None:
+            with open(inputFilePath, "r", encoding="utf-8") as f:
+                vaultIDs = {line.rstrip() for line in f if line.strip()}
+        with open(f"{outputPath}/output.csv", "w", newline="") as outputFile:
+            csvWriter = csv.writer(outputFile)
+            csvWriter.writerow(
+                [
+                    "vaultName",
+                    "vaultUUID",
+                    "userName",
+                    "groupName",
+                    "email",
+                    "userOrGroupUUID",
+                    "permissions",
+                ]
+            )
+            writeSnapshotReport(csvWriter, vaultIDs)
+        return
+
     checkCLIVersion()
     if inputFilePath is None:
         try:
@@ -8,8 +8,21 @@ import subprocess
 import csv
 import json
 import sys
+import argparse
 from dataclasses import dataclass
 
+parser = argparse.ArgumentParser(
+    "Vault User and Group Access Report Generator",
+    "Generates a csv-like report of every user with access to each vault, directly or through a group.",
+)
+parser.add_argument(
+    "--snapshot",
+    action="store",
+    dest="snapshotPath",
+    help="Read from an access graph snapshot built by access_snapshot.py instead of querying the CLI.",
+)
+args = parser.parse_args()
+
 scriptPath = os.path.dirname(__file__)
 outputPath = scriptPath
 
@@ -166,7 +179,44 @@ def writeReport(vaults: Vault):
                 )
 
 
+# Populate vaults from an access graph snapshot instead of the CLI.
+def loadSnapshot(snapshotPath):
+    import access_snapshot
+
+    conn = access_snapshot.openSnapshot(snapshotPath)
+    vaults = {}
+    for row in conn.execute("SELECT id, name FROM vaults ORDER BY name"):
+        vaults[row["id"]] = Vault(name=row["name"], uuid=row["id"])
+    for user in access_snapshot.vaultUserRows(conn):
+        vaults[user["vaultUUID"]].users.append(
+            {
+                "name": user["userName"],
+                "email": user["email"],
+                "uuid": user["userUUID"],
+                "assignment": "Direct",
+                "state": user["state"],
+                "permissions": user["permissions"],
+            }
+        )
+    for user in access_snapshot.vaultGroupMemberRows(conn):
+        vaults[user["vaultUUID"]].users.append(
+            {
+                "name": user["userName"],
+                "email": user["email"],
+                "uuid": user["userUUID"],
+                "assignment": f'Group ({user["groupName"]})',
+                "state": user["state"],
+                "permissions": user["permissions"],
+            }
+        )
+
+
 def main():
+    if args.snapshotPath is not None:
+        loadSnapshot(args.snapshotPath)
+        writeReport(Vault.getAll())
+        return
+
     checkCLIVersion()
     counter = 1
     # Populate initial data
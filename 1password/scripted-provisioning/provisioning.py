@@ -1,13 +1,18 @@
+import argparse
 import subprocess
 import csv
+import hashlib
+import json
 import re
 import os
 import sys
-import threading
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from queue import Queue
-from typing import List, Dict, Optional, Any, Tuple
+from typing import Callable, Iterator, List, Dict, Optional, Any, Tuple
+
+# Shared CLI/SDK session layer, one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from op_session import AdaptiveLimiter, OpSession, is_rate_limited
 
 # ANSI color codes for colorful terminal output
 CYAN: str = "\033[96m"
@@ -17,6 +22,20 @@ GREEN: str = "\033[92m"
 RESET: str = "\033[0m"
 BLINK: str = "\033[5m"
 
+# Upper bound on concurrent 1Password CLI calls; override with --max-workers
+DEFAULT_MAX_WORKERS: int = 8
+RATE_LIMIT_RETRIES: int = 5
+
+# main() attaches an AdaptiveLimiter sized by --max-workers once arguments are parsed
+session: OpSession = OpSession(max_retries=RATE_LIMIT_RETRIES)
+
+def run_concurrently(worker: Callable[..., Dict[str, Any]], jobs: List[Tuple], max_workers: int) -> Iterator[Dict[str, Any]]:
+    # Run worker(*job) for every job on a thread pool and yield results as they complete
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(worker, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
 def wrap_text(text: str, max_width: int) -> List[str]:
     # Break text into lines that fit within a set width
     if not text:
@@ -294,13 +313,8 @@ def show_user_list(action: str) -> Optional[List[Dict[str, str]]]:
 def invoke_op_command(arguments: List[str]) -> Tuple[bool, str]:
     # Run a 1Password CLI command and handle its output
     try:
-        # Execute the command and capture output
-        process = subprocess.run(
-            ["op"] + arguments,
-            capture_output=True,
-            text=True,
-            check=False
-        )
+        # Execute the command on the shared session, backing off while rate limited
+        process = session.run(arguments)
         stdout: str = process.stdout
         stderr: str = process.stderr
         exit_code: int = process.returncode
@@ -335,7 +349,7 @@ def invoke_op_command(arguments: List[str]) -> Tuple[bool, str]:
             return False, "Invalid command syntax"
         return False, error_message
 
-def process_user(name: str, identifier: str, action: str, result_queue: Queue) -> None:
+def process_user(name: str, identifier: str, action: str) -> Dict[str, str]:
     # Process a single user for the given action (provision, suspend, etc.)
     status: str = "Success"
     message: str = ""
@@ -362,7 +376,12 @@ def process_user(name: str, identifier: str, action: str, result_queue: Queue) -
         }[action]
         # Run the command and check result
         op_result: Tuple[bool, str] = invoke_op_command(op_args)
-        if not op_result[0]:
+        if not op_result[0] and is_rate_limited(op_result[1]):
+            # Still rate limited after retrying; leave for a later run
+            status = "Pending"
+            message = op_result[1]
+            full_message = message
+        elif not op_result[0]:
             status = "Failed"
             message = op_result[1]
             full_message = message
@@ -371,16 +390,255 @@ def process_user(name: str, identifier: str, action: str, result_queue: Queue) -
             message = op_result[1]
             full_message = message
 
-    # Store result in queue for main thread
-    result_queue.put({
+    return {
         "Name": name,
         "Email": identifier,
         "Status": status,
         "FullMessage": full_message
-    })
+    }
+
+def get_user_info(identifier: str) -> Dict[str, Any]:
+    # Get user details from 1Password CLI
+    op_result: Tuple[bool, str] = invoke_op_command(["user", "get", identifier])
+    name: str = "Unknown"
+    email: str = identifier
+    if op_result[0]:
+        # Parse name and email from CLI output
+        name_match = re.search(r"Name:\s*([^\n]+)", op_result[1])
+        email_match = re.search(r"Email:\s*([^\n]+)", op_result[1])
+        if name_match:
+            name = name_match.group(1).strip()
+        if email_match:
+            email = email_match.group(1).strip()
+    return {
+        "Identifier": identifier,
+        "Name": name,
+        "Email": email,
+        "Exists": op_result[0],
+        "ErrorMessage": op_result[1] if not op_result[0] else None
+    }
+
+def fetch_account_users() -> Optional[Dict[str, Dict[str, str]]]:
+    # Index every account user by UUID and lowercase email with a single CLI call
+    op_result: Tuple[bool, str] = invoke_op_command(["user", "list", "--format=json"])
+    if not op_result[0]:
+        return None
+    try:
+        users: List[Dict[str, str]] = json.loads(op_result[1] or "[]")
+    except json.JSONDecodeError:
+        return None
+    index: Dict[str, Dict[str, str]] = {}
+    for user in users:
+        index[user["id"]] = user
+        index[user.get("email", "").lower()] = user
+    return index
+
+def preflight_jobs(jobs: List[Tuple[str, str, str]]) -> Tuple[List[Tuple[str, str, str]], List[Dict[str, str]]]:
+    # Split jobs into real state changes and rows that would be no-ops against the current account
+    index: Optional[Dict[str, Dict[str, str]]] = fetch_account_users()
+    if index is None:
+        print(f"{YELLOW}⚠️ Could not fetch the current user list; sending every row to 1Password.{RESET}")
+        return jobs, []
+
+    changes: List[Tuple[str, str, str]] = []
+    skipped: List[Dict[str, str]] = []
+    for name, identifier, action in jobs:
+        if not identifier:
+            # Reported as a failure by process_user
+            changes.append((name, identifier, action))
+            continue
+        user: Optional[Dict[str, str]] = index.get(identifier) or index.get(identifier.lower())
+        state: str = user.get("state", "") if user else ""
+        reason: Optional[str] = None
+        if action == "provision" and user:
+            reason = f"Already a member ({state})"
+        elif action != "provision" and not user:
+            reason = "User not found"
+        elif action == "suspend" and state in ["SUSPENDED", "TRANSFER_SUSPENDED"]:
+            reason = f"Already suspended ({state})"
+        elif action == "reactivate" and state not in ["SUSPENDED", "TRANSFER_SUSPENDED"]:
+            reason = f"Not suspended ({state})"
+
+        if reason:
+            skipped.append({"Name": name, "Email": identifier, "Status": "Skipped", "FullMessage": reason})
+        else:
+            changes.append((name, identifier, action))
+    return changes, skipped
+
+def read_csv_jobs(csv_path: str, action: str) -> Tuple[Optional[List[Tuple[str, str, str]]], str]:
+    # Read and validate a CSV file, returning (name, identifier, action) jobs or an error message
+    try:
+        with open(csv_path, newline='') as csvfile:
+            reader = csv.DictReader(csvfile)
+            if not reader.fieldnames:
+                return None, "CSV file is empty or missing headers. Please use a valid CSV file."
+            csv_data: List[Dict[str, str]] = [row for row in reader]
+    except Exception as e:
+        return None, f"Error reading CSV: {str(e)}. Please use a valid CSV file."
+
+    if not csv_data:
+        return None, "CSV file contains no data. Please use a valid CSV file."
+
+    # Check required columns
+    if action == "provision":
+        if not any(col.lower() == "name" for col in reader.fieldnames) or not any(col.lower() == "email" for col in reader.fieldnames):
+            return None, "CSV must have 'Name' and 'Email' columns for provisioning. Please use a valid CSV file."
+    else:
+        if not any(col.lower() == "uuid" for col in reader.fieldnames) and not any(col.lower() == "email" for col in reader.fieldnames):
+            return None, f"CSV must have either 'UUID' or 'Email' column for {action}. Please use a valid CSV file."
+
+    # Extract identifiers and names from CSV
+    jobs: List[Tuple[str, str, str]] = []
+    for row in csv_data:
+        if action == "provision":
+            name = str(row.get("Name", "")).replace('"', "'")
+            identifier = str(row.get("Email", ""))
+        else:
+            uuid = str(row.get("UUID", ""))
+            email = str(row.get("Email", ""))
+            identifier = uuid or email
+            name = str(row.get("Name", ""))
+        jobs.append((name, identifier, action))
+    return jobs, ""
+
+JOURNAL_FIELDS: List[str] = ["Timestamp", "CsvSha256", "Name", "Email", "Status", "FullMessage"]
+
+def csv_fingerprint(csv_path: str, action: str) -> str:
+    # Hash of the CSV contents and action, so a journal only applies to the file it was written for
+    digest = hashlib.sha256(action.encode("utf-8"))
+    with open(csv_path, 'rb') as csvfile:
+        for chunk in iter(lambda: csvfile.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_journal(journal_path: str, fingerprint: str) -> Dict[str, Dict[str, str]]:
+    # Read the latest journaled outcome for each identifier written for this CSV.
+    # A journal in an older format is moved aside so new rows don't mix with it.
+    outcomes: Dict[str, Dict[str, str]] = {}
+    if not os.path.exists(journal_path):
+        return outcomes
+    with open(journal_path, newline='') as journal:
+        reader = csv.DictReader(journal)
+        rows: List[Dict[str, str]] = list(reader)
+        fieldnames: Optional[List[str]] = reader.fieldnames
+    if fieldnames and fieldnames != JOURNAL_FIELDS:
+        os.replace(journal_path, journal_path + ".old")
+        print(f"{YELLOW}⚠️ {journal_path} uses an older format; moved it to {journal_path}.old{RESET}")
+        return outcomes
+    for row in rows:
+        if row.get("CsvSha256") == fingerprint and row.get("Email") is not None and row.get("Timestamp"):
+            outcomes[row["Email"].lower()] = row
+    return outcomes
+
+def dedupe_jobs(jobs: List[Tuple[str, str, str]]) -> Tuple[List[Tuple[str, str, str]], int]:
+    # Keep the first row for each identifier (emails compare case-insensitively)
+    seen: set = set()
+    unique: List[Tuple[str, str, str]] = []
+    for job in jobs:
+        if job[1].lower() not in seen:
+            seen.add(job[1].lower())
+            unique.append(job)
+    return unique, len(jobs) - len(unique)
+
+def run_headless(csv_path: str, action: str, results_path: Optional[str], journal_path: Optional[str], max_workers: int, retry_failed: bool = False) -> int:
+    # Process a CSV without prompts, journaling every outcome so an interrupted run can resume
+    jobs, error = read_csv_jobs(csv_path, action)
+    if jobs is None:
+        print(f"{RED}😕 {error}{RESET}", file=sys.stderr)
+        return 1
+    jobs, duplicates = dedupe_jobs(jobs)
+    if duplicates:
+        print(f"{YELLOW}⚠️ Ignoring {duplicates} repeated rows for users already listed in {csv_path}.{RESET}")
+
+    journal_path = journal_path or f"{os.path.splitext(csv_path)[0]}.{action}.journal.csv"
+    fingerprint: str = csv_fingerprint(csv_path, action)
+    journaled: Dict[str, Dict[str, str]] = load_journal(journal_path, fingerprint)
+    # Pending (rate limited) users are retried, and failed users with --retry-failed
+    retry_statuses: Tuple[str, ...] = ("Pending", "Failed") if retry_failed else ("Pending",)
+    pending: List[Tuple[str, str, str]] = [
+        job for job in jobs
+        if job[1].lower() not in journaled or journaled[job[1].lower()]["Status"] in retry_statuses
+    ]
+    if len(pending) < len(jobs):
+        print(f"{CYAN}📋 Resuming from {journal_path}: {len(jobs) - len(pending)} of {len(jobs)} users already processed.{RESET}")
+
+    pending, skipped = preflight_jobs(pending)
+    if skipped:
+        print(f"{CYAN}⏭️ Skipping {len(skipped)} users that are already in the requested state.{RESET}")
+
+    write_header: bool = not os.path.exists(journal_path)
+    print(f"{CYAN}🔧 Processing {len(pending)} users for {action}...{RESET}")
+    with open(journal_path, 'a', newline='') as journal:
+        writer = csv.DictWriter(journal, fieldnames=JOURNAL_FIELDS)
+        if write_header:
+            writer.writeheader()
+        for result in skipped:
+            journaled[result["Email"].lower()] = {"Timestamp": datetime.now().isoformat(), "CsvSha256": fingerprint, **result}
+            writer.writerow(journaled[result["Email"].lower()])
+        done: int = 0
+        for result in run_concurrently(process_user, pending, max_workers):
+            done += 1
+            journaled[result["Email"].lower()] = {"Timestamp": datetime.now().isoformat(), "CsvSha256": fingerprint, **result}
+            writer.writerow(journaled[result["Email"].lower()])
+            journal.flush()
+            print(f"  {done}/{len(pending)} {result['Status']}: {result['Email']}")
+
+    # Write results for every row in the CSV, including ones from earlier runs
+    results: List[Dict[str, str]] = [
+        {key: journaled[identifier.lower()][key] for key in ["Name", "Email", "Status", "FullMessage"]}
+        for _, identifier, _ in jobs
+        if identifier.lower() in journaled
+    ]
+    results_path = results_path or f"{action}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    with open(results_path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=["Name", "Email", "Status", "FullMessage"])
+        writer.writeheader()
+        writer.writerows(results)
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["Status"]] = counts.get(result["Status"], 0) + 1
+    summary: str = ", ".join(f"{count} {status.lower()}" for status, count in sorted(counts.items()))
+    print(f"\n{CYAN}📊 {action} completed: {summary}. Results saved to {os.path.abspath(results_path)}{RESET}")
+    if counts.get("Pending"):
+        print(f"{YELLOW}🔄 Some users were rate limited. Re-run the same command to resume.{RESET}")
+        return 3
+    if counts.get("Failed") and not retry_failed:
+        print(f"{YELLOW}🔄 Add --retry-failed to the same command to try the failed users again.{RESET}")
+    return 1 if counts.get("Failed") else 0
 
 def main() -> None:
     # Manage 1Password users via CSV or manual input
+    parser = argparse.ArgumentParser(description="Provision, suspend, reactivate, or delete 1Password users.")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Maximum number of concurrent 1Password CLI calls (default: {DEFAULT_MAX_WORKERS}). "
+                             "The script adapts below this ceiling when it sees slow responses or rate limits.")
+    parser.add_argument("--csv", help="Run without prompts: path to the CSV file to process. Requires --action.")
+    parser.add_argument("--action", choices=["provision", "suspend", "reactivate", "delete"],
+                        help="Run without prompts: action to apply to every user in --csv.")
+    parser.add_argument("--results", help="Path of the results CSV written in headless mode (default: <action>_<timestamp>.csv).")
+    parser.add_argument("--journal", help="Path of the journal used to resume headless runs (default: <csv>.<action>.journal.csv).")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="In headless mode, also retry users whose journaled outcome is Failed.")
+    parser.add_argument("--yes", action="store_true",
+                        help="Confirm suspend, reactivate, or delete in headless mode.")
+    args = parser.parse_args()
+    max_workers: int = max(1, args.max_workers)
+    session.limiter = AdaptiveLimiter(max_workers)
+
+    if args.csv or args.action:
+        if not (args.csv and args.action):
+            parser.error("--csv and --action must be used together")
+        if args.action != "provision" and not args.yes:
+            parser.error(f"--yes is required to {args.action} users without prompts")
+        if not os.path.exists(args.csv):
+            parser.error(f"file '{args.csv}' not found")
+        # whoami is a cheap sign-in check; preflight_jobs lists every user anyway
+        if not invoke_op_command(["whoami", "--format=json"])[0]:
+            print(f"{RED}😕 Not signed in to the 1Password CLI. Sign in or export an OP_SESSION token first.{RESET}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(run_headless(args.csv, args.action, args.results, args.journal, max_workers, args.retry_failed))
+
     print(f"\n{CYAN}🚀 Welcome to the 1Password User Management Script! 🎉{RESET}")
     print("This script provisions, suspends, reactivates, or deletes users from a CSV file or manually.")
     print("CSV must have 'Name' and 'Email' columns (case-insensitive) if used.\n")
@@ -403,18 +661,11 @@ def main() -> None:
             print(f"{RED}😕 Account shorthand cannot be empty. Exiting.{RESET}\n")
             sys.exit(1)
 
-        try:
-            process = subprocess.run(
-                ["op", "signin", "--account", account_shorthand, "--raw"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            session_token: str = process.stdout.strip()
-            os.environ[f"OP_SESSION_{account_shorthand}"] = session_token
+        signed_in, signin_output = session.signin(account_shorthand)
+        if signed_in:
             print(f"{GREEN}✅ Successfully authenticated with 1Password CLI.{RESET}\n")
-        except subprocess.SubprocessError as e:
-            print(f"{RED}😕 Failed to authenticate with 1Password CLI: {str(e)}{RESET}\n")
+        else:
+            print(f"{RED}😕 Failed to authenticate with 1Password CLI: {signin_output}{RESET}\n")
             sys.exit(1)
     else:
         print(f"{GREEN}✅ Already authenticated with 1Password CLI.{RESET}\n")
@@ -500,51 +751,24 @@ def main() -> None:
                 csv_path = None
                 continue
 
-        try:
-            # Read and validate CSV data
-            csv_data: List[Dict[str, str]] = []
-            with open(csv_path, newline='') as csvfile:
-                reader = csv.DictReader(csvfile)
-                if not reader.fieldnames:
-                    print(f"\n{RED}😕 CSV file is empty or missing headers. Please use a valid CSV file.{RESET}")
-                    return
-                csv_data = [row for row in reader]
-
-            if not csv_data:
-                print(f"\n{RED}😕 CSV file contains no data. Please use a valid CSV file.{RESET}")
-                return
-
-            # Check required columns
-            if action == "provision":
-                if not any(col.lower() == "name" for col in reader.fieldnames) or not any(col.lower() == "email" for col in reader.fieldnames):
-                    print(f"\n{RED}😕 CSV must have 'Name' and 'Email' columns for provisioning. Please use a valid CSV file.{RESET}")
-                    return
-            else:
-                if not any(col.lower() == "uuid" for col in reader.fieldnames) and not any(col.lower() == "email" for col in reader.fieldnames):
-                    print(f"\n{RED}😕 CSV must have either 'UUID' or 'Email' column for {action}. Please use a valid CSV file.{RESET}")
-                    return
-        except Exception as e:
-            print(f"\n{RED}😕 Error reading CSV: {str(e)}. Please use a valid CSV file.{RESET}")
+        jobs, error = read_csv_jobs(csv_path, action)
+        if jobs is None:
+            print(f"\n{RED}😕 {error}{RESET}")
             return
 
-        csv_identifiers: List[str] = []
-        csv_names: List[str] = []
-        # Extract identifiers and names from CSV
-        for row in csv_data:
-            if action == "provision":
-                name = str(row.get("Name", "")).replace('"', "'")
-                email = str(row.get("Email", ""))
-                identifier = email
-            else:
-                uuid = str(row.get("UUID", ""))
-                email = str(row.get("Email", ""))
-                identifier = uuid or email
-                name = str(row.get("Name", ""))
-            csv_identifiers.append(identifier)
-            csv_names.append(name)
+        # Skip rows that would not change anything in the account
+        jobs, skipped = preflight_jobs(jobs)
+        results.extend(skipped)
+        if skipped:
+            print(f"{CYAN}⏭️ Skipping {len(skipped)} users that are already in the requested state.{RESET}")
+        if not jobs:
+            print(f"\n{CYAN}🎉 Nothing to do: every user is already in the requested state.{RESET}\n")
+
+        csv_names: List[str] = [job[0] for job in jobs]
+        csv_identifiers: List[str] = [job[1] for job in jobs]
 
         # Confirm destructive actions
-        if action in ["suspend", "reactivate", "delete"]:
+        if jobs and action in ["suspend", "reactivate", "delete"]:
             print("\n")
             msg: str = {
                 "suspend": "Suspending users disables their account access!",
@@ -560,36 +784,14 @@ def main() -> None:
                 print(f"{CYAN}👋 Operation cancelled.{RESET}\n")
                 return
 
-        print(f"\n{CYAN}🔧 Processing {len(csv_data)} users for {action}...{RESET}\n")
-        result_queue: Queue = Queue()
-        threads: List[threading.Thread] = []
-        max_threads: int = 3  # Limit to 3 threads to avoid overwhelming the system
-
-        # Process users(branch: main) users in parallel
-        for i, row in enumerate(csv_data):
-            while len([t for t in threads if t.is_alive()]) >= max_threads:
-                time.sleep(0.1)
-
-            if action == "provision":
-                name = str(row.get("Name", "")).replace('"', "'")
-                identifier = str(row.get("Email", ""))
-            else:
-                uuid = str(row.get("UUID", ""))
-                email = str(row.get("Email", ""))
-                identifier = uuid or email
-                name = str(row.get("Name", ""))
-
-            thread = threading.Thread(target=process_user, args=(name, identifier, action, result_queue))
-            thread.start()
-            threads.append(thread)
+        print(f"\n{CYAN}🔧 Processing {len(jobs)} users for {action}...{RESET}\n")
 
-        # Wait for all threads to finish
-        for thread in threads:
-            thread.join()
-
-        # Collect results from queue
-        while not result_queue.empty():
-            results.append(result_queue.get())
+        # Process users in parallel, collecting results as they complete
+        done: int = 0
+        for result in run_concurrently(process_user, jobs, max_workers):
+            done += 1
+            results.append(result)
+            print(f"  {done}/{len(jobs)} {result['Status']}: {result['Email']}")
 
     else:
         print(f"\n{CYAN}🔧 Manually managing a user for {action}...{RESET}\n")
@@ -657,47 +859,10 @@ def main() -> None:
             name = "Unknown"
 
         if action in ["suspend", "reactivate", "delete"]:
-            user_details: List[Dict[str, Any]] = []
-            result_queue = Queue()
-            threads = []
-
             # Fetch user info for each identifier
-            for identifier in identifiers:
-                while len([t for t in threads if t.is_alive()]) >= 3:
-                    time.sleep(0.1)
-
-                def get_user_info(identifier: str, queue: Queue) -> None:
-                    # Get user details from 1Password CLI
-                    op_result: Tuple[bool, str] = invoke_op_command(["user", "get", identifier])
-                    name: str = "Unknown"
-                    email: str = identifier
-                    if op_result[0]:
-                        # Parse name and email from CLI output
-                        name_match = re.search(r"Name:\s*([^\n]+)", op_result[1])
-                        email_match = re.search(r"Email:\s*([^\n]+)", op_result[1])
-                        if name_match:
-                            name = name_match.group(1).strip()
-                        if email_match:
-                            email = email_match.group(1).strip()
-                    queue.put({
-                        "Identifier": identifier,
-                        "Name": name,
-                        "Email": email,
-                        "Exists": op_result[0],
-                        "ErrorMessage": op_result[1] if not op_result[0] else None
-                    })
-
-                thread = threading.Thread(target=get_user_info, args=(identifier, result_queue))
-                thread.start()
-                threads.append(thread)
-
-            # Wait for user info threads to finish
-            for thread in threads:
-                thread.join()
-
-            # Collect user details from queue
-            while not result_queue.empty():
-                user_details.append(result_queue.get())
+            user_details: List[Dict[str, Any]] = list(
+                run_concurrently(get_user_info, [(identifier,) for identifier in identifiers], max_workers)
+            )
 
             # Handle users that don't exist
             failed_users: List[Dict[str, Any]] = [u for u in user_details if not u["Exists"]]
@@ -743,25 +908,8 @@ def main() -> None:
                 return
 
         print(f"\n{CYAN}🔧 Processing user(s) for {action}...{RESET}\n")
-        result_queue = Queue()
-        threads = []
-
-        # Process each user in a separate thread
-        for identifier in identifiers:
-            while len([t for t in threads if t.is_alive()]) >= 3:
-                time.sleep(0.1)
-
-            thread = threading.Thread(target=process_user, args=(name, identifier, action, result_queue))
-            thread.start()
-            threads.append(thread)
-
-        # Wait for all processing threads to finish
-        for thread in threads:
-            thread.join()
-
-        # Collect results from queue
-        while not result_queue.empty():
-            results.append(result_queue.get())
+        # Process each user in parallel
+        results.extend(run_concurrently(process_user, [(name, identifier, action) for identifier in identifiers], max_workers))
 
     # Save results to a CSV file
     timestamp: str = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,62 @@
+# Times the absentee pass of identify-absentees.py on synthetic users, without
+# calling 1Password. Run it after changing find_idle_users to check that the
+# cost per user stays flat as the account grows.
+#
+# Usage:
+#   python3 benchmark_absentees.py [--users 100000] [--days 90]
+import argparse
+import importlib.util
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+# identify-absentees.py has a hyphen in its name, so load it by path
+spec = importlib.util.spec_from_file_location(
+    "identify_absentees", os.path.join(os.path.dirname(os.path.abspath(__file__)), "identify-absentees.py")
+)
+identify_absentees = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(identify_absentees)
+
+
+def synthetic_users(count: int, now: datetime, seed: int = 1) -> List[Dict[str, Any]]:
+    # Mostly ISO 8601 logins over the past year, with some US-format dates,
+    # never-logged-in users, missing dates and unparseable values mixed in
+    rng = random.Random(seed)
+    users = []
+    for i in range(count):
+        last_login = now - timedelta(seconds=rng.randrange(365 * 86400))
+        roll = rng.random()
+        if roll < 0.02:
+            last_auth_at = "0001-01-01T00:00:00Z"
+        elif roll < 0.03:
+            last_auth_at = ""
+        elif roll < 0.035:
+            last_auth_at = "yesterday"
+        elif roll < 0.10:
+            last_auth_at = last_login.strftime("%m/%d/%Y %H:%M:%S")
+        else:
+            last_auth_at = last_login.strftime("%Y-%m-%dT%H:%M:%SZ")
+        users.append({"id": f"U{i:025d}", "name": f"User {i}", "email": f"user{i}@example.com", "last_auth_at": last_auth_at})
+    return users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the identify-absentees idle user pass.")
+    parser.add_argument("--users", type=int, default=100000, help="Largest number of synthetic users (default 100000).")
+    parser.add_argument("--days", type=int, default=90, help="Idle threshold in days (default 90).")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    print(f"{'Users':>10}  {'Seconds':>8}  {'µs/user':>8}  {'Idle':>8}")
+    for count in (args.users // 4, args.users // 2, args.users):
+        users = synthetic_users(count, now)
+        started = time.perf_counter()
+        idle_users, _ = identify_absentees.find_idle_users(users, args.days, now, verbose=False)
+        elapsed = time.perf_counter() - started
+        print(f"{count:>10}  {elapsed:>8.3f}  {elapsed / count * 1e6:>8.2f}  {len(idle_users):>8}")
+
+
+if __name__ == "__main__":
+    main()
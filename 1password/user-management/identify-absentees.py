@@ -1,10 +1,16 @@
+import argparse
 import subprocess
 import json
 import csv
 import re
 import os
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
 # Try to import tqdm for a nice progress bar, but it’s optional
@@ -15,13 +21,33 @@ try:
 except ImportError:
     TQDM_AVAILABLE = False
 
+# Shared CLI/SDK session layer, one directory up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from op_session import AdaptiveLimiter, OpSession
+
+# Upper bound on concurrent `op user get` calls; override with --max-workers.
+# The limiter starts low and widens while calls stay fast, halving on 429s.
+DEFAULT_MAX_WORKERS = 16
+op_limiter = AdaptiveLimiter(DEFAULT_MAX_WORKERS)
+
+# One 1Password session shared by every thread in this run
+session = OpSession(limiter=op_limiter)
+
+# last_auth_at values are cached per user so repeated checks skip `op user get`
+DEFAULT_CACHE_PATH = "last_auth_cache.json"
+DEFAULT_CACHE_TTL_HOURS = 24.0
+
 
 def run_op_command(args: List[str]) -> Dict[str, Any]:
     # Runs a 1Password CLI command and returns JSON output
     # Assumes we're already logged in, so no fuss with tokens
     cmd = ["op"] + args
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = session.run(args)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd, result.stdout, result.stderr
+            )
         return json.loads(result.stdout) if result.stdout else {}
     except subprocess.CalledProcessError as e:
         print(f"  ⚠️  Whoops, hit a snag running {' '.join(cmd)}: {e.stderr}")
@@ -31,33 +57,225 @@ def run_op_command(args: List[str]) -> Dict[str, Any]:
         raise
 
 
-def parse_user_list_output() -> List[Dict[str, str]]:
-    # Grabs the user list from 1Password’s non-JSON output and parses it
-    # The output is tabular, so we split it into fields
+def list_users() -> List[Dict[str, str]]:
+    # Grabs every user in one `op user list --format=json` call, keeping only the
+    # fields this script uses
     try:
-        result = subprocess.run(
-            ["op", "user", "list"], capture_output=True, text=True, check=True
-        )
-        lines = result.stdout.splitlines()
-        users = []
-        # Skip empty lines and header
-        data_lines = [line for line in lines[1:] if line.strip()]
-        for line in data_lines:
-            # Split on multiple spaces (approximating PowerShell’s split)
-            fields = re.split(r"\s{2,}", line.strip())
-            if len(fields) >= 4:  # Expect at least ID, NAME, EMAIL, STATE
-                users.append(
-                    {
-                        "id": fields[0],
-                        "name": fields[1],
-                        "email": fields[2],
-                        "state": fields[3],
-                    }
-                )
-        return users
+        users = session.json(["user", "list"]) or []
     except subprocess.CalledProcessError as e:
         print(f"  ⚠️  Couldn’t fetch user list: {e.stderr}")
         raise
+    return [
+        {
+            "id": user["id"],
+            "name": user.get("name", ""),
+            "email": user.get("email", ""),
+            "state": user.get("state", ""),
+        }
+        for user in users
+    ]
+
+
+class AuthCache:
+    # A small JSON file of user ID -> last_auth_at and when it was fetched.
+    # Entries older than the TTL are ignored and re-fetched.
+    def __init__(self, path: Optional[str], ttl_hours: float) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print(f"  ⚠️  Couldn’t read the cache at {self.path}; starting fresh.")
+
+    def get(self, user_id: str, active_since: Optional[datetime] = None) -> Optional[str]:
+        # Returns the cached last login if it is still fresh. A login at or after
+        # active_since is returned even when stale: a later login only moves it
+        # forward, so the user can't have become idle since it was cached.
+        # A TTL of 0 or less disables the cache, shortcut included.
+        entry = self.entries.get(user_id)
+        if not entry or self.ttl_seconds <= 0:
+            return None
+        if time.time() - entry["fetched_at"] < self.ttl_seconds:
+            return entry["last_auth_at"]
+        if active_since is not None:
+            last_login = parse_date(entry["last_auth_at"])
+            if last_login and last_login >= active_since:
+                return entry["last_auth_at"]
+        return None
+
+    def put(self, user_id: str, last_auth_at: str) -> None:
+        with self.lock:
+            self.entries[user_id] = {"last_auth_at": last_auth_at, "fetched_at": time.time()}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Write to a temporary file first so an interrupted run can't corrupt the cache
+        with self.lock:
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self.entries, f)
+            os.replace(self.path + ".tmp", self.path)
+
+
+IDLE_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    state TEXT,
+    last_auth_at TEXT,
+    fetched_at REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at TEXT,
+    days INTEGER
+);
+CREATE TABLE IF NOT EXISTS observations (
+    run_id INTEGER,
+    user_id TEXT,
+    last_auth_at TEXT,
+    days_idle REAL,
+    idle INTEGER,
+    PRIMARY KEY (run_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS observations_user ON observations (user_id);
+"""
+
+
+class IdleHistory(AuthCache):
+    # A SQLite store of every user's last login plus one row per user per run,
+    # used in place of the JSON cache when --db is given. Runs only re-fetch
+    # users that are new, changed state or email, or aren't known to be active.
+    def load(self) -> None:
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(IDLE_HISTORY_SCHEMA)
+        self.known: Dict[str, sqlite3.Row] = {}
+        for row in self.conn.execute("SELECT * FROM users"):
+            self.known[row["id"]] = row
+            if row["fetched_at"] is not None:
+                self.entries[row["id"]] = {"last_auth_at": row["last_auth_at"], "fetched_at": row["fetched_at"]}
+
+    def sync_users(self, users: List[Dict[str, str]]) -> None:
+        # Store the listed users, dropping the cached login of anyone new or changed.
+        # Stored users missing from the listing have been deleted from the account.
+        listed = {user["id"] for user in users}
+        for user in users:
+            row = self.known.get(user["id"])
+            if row is None or (row["email"], row["state"]) != (user["email"], user["state"]):
+                self.entries.pop(user["id"], None)
+        deleted = [user_id for user_id, row in self.known.items() if user_id not in listed and row["state"] != "DELETED"]
+        for user_id in deleted:
+            self.entries.pop(user_id, None)
+        self.conn.executemany(
+            "INSERT INTO users (id, name, email, state) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, email = excluded.email, state = excluded.state",
+            [(user["id"], user["name"], user["email"], user["state"]) for user in users],
+        )
+        self.conn.executemany(
+            "UPDATE users SET state = 'DELETED' WHERE id = ?", [(user_id,) for user_id in deleted]
+        )
+        self.conn.commit()
+
+    def save(self) -> None:
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE users SET last_auth_at = ?, fetched_at = ? WHERE id = ?",
+                [(entry["last_auth_at"], entry["fetched_at"], user_id) for user_id, entry in self.entries.items()],
+            )
+            self.conn.commit()
+
+    def record_run(self, days: int, checked: List[Dict[str, Any]]) -> None:
+        # checked holds one dict per user with id, last_auth_at, days_idle (None if never) and idle
+        cursor = self.conn.execute(
+            "INSERT INTO runs (run_at, days) VALUES (?, ?)", (datetime.utcnow().isoformat(), days)
+        )
+        self.conn.executemany(
+            "INSERT INTO observations VALUES (?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, user["id"], user["last_auth_at"], user["days_idle"], int(user["idle"])) for user in checked],
+        )
+        self.conn.commit()
+
+    def idle_users(self, days: int) -> List[Dict[str, Any]]:
+        # Active users whose stored last login is more than `days` ago, longest idle first
+        now = datetime.utcnow()
+        idle = []
+        for row in self.conn.execute("SELECT * FROM users WHERE state = 'ACTIVE' AND last_auth_at IS NOT NULL"):
+            if row["last_auth_at"] in NEVER_LOGGED_IN:
+                idle.append(dict(row, days_idle="Never logged in"))
+                continue
+            last_login = parse_date(row["last_auth_at"])
+            if last_login:
+                days_idle = round((now - last_login).total_seconds() / 86400, 1)
+                if days_idle > days:
+                    idle.append(dict(row, days_idle=days_idle))
+        idle.sort(key=lambda user: float("inf") if isinstance(user["days_idle"], str) else user["days_idle"], reverse=True)
+        return idle
+
+    def newly_idle_users(self) -> List[Dict[str, Any]]:
+        # Users idle in the latest run who weren't idle in the run before it
+        runs = [row["id"] for row in self.conn.execute("SELECT id FROM runs ORDER BY id DESC LIMIT 2")]
+        if not runs:
+            return []
+        previous = runs[1] if len(runs) > 1 else -1
+        return [
+            dict(row, days_idle=row["days_idle"] if row["days_idle"] is not None else "Never logged in")
+            for row in self.conn.execute(
+                """
+                SELECT u.id, u.name, u.email, o.last_auth_at, o.days_idle
+                FROM observations o
+                JOIN users u ON u.id = o.user_id
+                LEFT JOIN observations p ON p.user_id = o.user_id AND p.run_id = ?
+                WHERE o.run_id = ? AND o.idle = 1 AND COALESCE(p.idle, 0) = 0
+                ORDER BY o.days_idle IS NOT NULL, o.days_idle DESC
+                """,
+                (previous, runs[0]),
+            )
+        ]
+
+    def trend(self) -> List[sqlite3.Row]:
+        # Users checked and found idle in each run, oldest first
+        return list(self.conn.execute(
+            """
+            SELECT r.run_at, r.days, COUNT(o.user_id) AS checked, COALESCE(SUM(o.idle), 0) AS idle
+            FROM runs r LEFT JOIN observations o ON o.run_id = r.id
+            GROUP BY r.id ORDER BY r.id
+            """
+        ))
+
+
+# Disabled until main() loads the cache from --cache or --db
+auth_cache = AuthCache(None, 0)
+
+
+def run_query(history: IdleHistory, query: str, days: Optional[int]) -> None:
+    # Answers a question from the idle history without calling 1Password
+    if query == "trend":
+        runs = history.trend()
+        if not runs:
+            print("\n😕 No runs recorded yet.")
+            return
+        print("\nRun (UTC)                    Days  Checked  Idle")
+        for run in runs:
+            print(f"{run['run_at'][:19].ljust(28)} {str(run['days']).rjust(4)}  {str(run['checked']).rjust(7)}  {str(run['idle']).rjust(4)}")
+        return
+    if query == "newly-idle":
+        print_idle_users_table(history.newly_idle_users())
+        return
+    if days is None:
+        print("  ⚠️  --query idle needs --days N")
+        return
+    print_idle_users_table(history.idle_users(days))
 
 
 def fetch_user_details(user: Dict[str, str]) -> Optional[Dict[str, Any]]:
@@ -68,21 +286,36 @@ def fetch_user_details(user: Dict[str, str]) -> Optional[Dict[str, Any]]:
         details.update(
             {"id": user["id"], "name": user.get("name", ""), "email": user["email"]}
         )
+        auth_cache.put(user["id"], details.get("last_auth_at", ""))
         return details
     except subprocess.CalledProcessError:
         print(f"  ⚠️  Couldn’t grab details for user {user['id']}. Skipping.")
         return None
 
 
-def get_active_users() -> List[Dict[str, Any]]:
-    # Gets all active users, fetching details in parallel with 3 threads
-    users = parse_user_list_output()
-    active_users = [u for u in users if u["state"] == "ACTIVE"]
-    print(f"  🎉 Found {len(active_users)} active users!")
+def get_active_users(users: List[Dict[str, str]], days: int) -> List[Dict[str, Any]]:
+    # Gets all active users, fetching details in parallel. Threads are sized to the
+    # ceiling; the session's limiter decides how many `op` calls actually run at once.
+    # One pass over the list picks out active users and answers those the cache
+    # already covers, so only the remaining candidates are fetched.
+    active_since = datetime.utcnow() - timedelta(days=days)
+    known = []
+    active_users = []
+    for user in users:
+        if user["state"] != "ACTIVE":
+            continue
+        cached = auth_cache.get(user["id"], active_since)
+        if cached is None:
+            active_users.append(user)
+        else:
+            known.append(dict(user, last_auth_at=cached))
+    print(f"  🎉 Found {len(known) + len(active_users)} active users!")
+    if known:
+        print(f"  💾 {len(known)} of them have a cached last login and won’t be re-fetched.")
 
     # Fetch details in parallel
     print("\n🔍 Checking user activity...")
-    with ThreadPoolExecutor(max_workers=3) as executor:
+    with ThreadPoolExecutor(max_workers=op_limiter.max_limit) as executor:
         if TQDM_AVAILABLE:
             # Use tqdm for a fancy progress bar if available
             results = list(
@@ -103,19 +336,23 @@ def get_active_users() -> List[Dict[str, Any]]:
                 results.append(result)
                 print(f"  Processed {i}/{len(active_users)} users...", end="\r")
             print()  # Clear the line
+    auth_cache.save()
     # Filter out None results (failed fetches)
-    return [r for r in results if r is not None]
+    return known + [r for r in results if r is not None]
+
+
+ISO8601_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$")
+US_DATE_PATTERN = re.compile(r"^\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2}$")
+NEVER_LOGGED_IN = ("0001-01-01T00:00:00Z", "01/01/0001 00:00:00")
 
 
 def parse_date(date_str: str) -> Optional[datetime]:
     # Tries to parse dates in ISO 8601 or MM/dd/yyyy formats
-    iso8601_pattern = r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$"
-    us_date_pattern = r"^\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}:\d{2}$"
-
     try:
-        if re.match(iso8601_pattern, date_str):
-            return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
-        elif re.match(us_date_pattern, date_str):
+        if ISO8601_PATTERN.match(date_str):
+            # fromisoformat is much faster than strptime for the CLI's usual format
+            return datetime.fromisoformat(date_str[:-1])
+        elif US_DATE_PATTERN.match(date_str):
             return datetime.strptime(date_str, "%m/%d/%Y %H:%M:%S")
         else:
             return None
@@ -123,6 +360,86 @@ def parse_date(date_str: str) -> Optional[datetime]:
         return None
 
 
+# Login status codes stored per user in absentee_columns
+LOGIN_OK = 0
+LOGIN_MISSING = 1
+LOGIN_NEVER = 2
+LOGIN_UNPARSEABLE = 3
+
+
+def absentee_columns(users: List[Dict[str, Any]], now: datetime) -> Tuple[array, bytearray]:
+    # Parses every user's last_auth_at exactly once into two compact columns: days
+    # since last login (infinity when missing or never, 0 when unparseable, which is
+    # also the sort key) and a LOGIN_* status code per user
+    days_idle = array("d", bytes(8 * len(users)))
+    status = bytearray(len(users))
+    for index, user in enumerate(users):
+        last_auth_at = user.get("last_auth_at")
+        if not last_auth_at:
+            days_idle[index] = float("inf")
+            status[index] = LOGIN_MISSING
+        elif last_auth_at in NEVER_LOGGED_IN:
+            days_idle[index] = float("inf")
+            status[index] = LOGIN_NEVER
+        else:
+            last_login = parse_date(last_auth_at)
+            if last_login is None:
+                status[index] = LOGIN_UNPARSEABLE
+            else:
+                days_idle[index] = (now - last_login).total_seconds() / 86400
+    return days_idle, status
+
+
+def find_idle_users(
+    users: List[Dict[str, Any]], days: int, now: datetime, verbose: bool = True
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Returns (idle users, longest idle first; one record per checked user for the
+    # history). Sorting uses the precomputed column, so it stays O(n log n) with no
+    # date parsing inside the sort.
+    days_idle, status = absentee_columns(users, now)
+    order = sorted(range(len(users)), key=days_idle.__getitem__, reverse=True)
+    idle_users = []
+    checked = []
+    reset = "\033[0m"
+    for index in order:
+        user = users[index]
+        last_auth_at = user.get("last_auth_at", "")
+        code = status[index]
+        if code == LOGIN_MISSING:
+            if verbose:
+                print(f"  {user['email'].ljust(50)} No login date, skipping.")
+            continue
+
+        # Handle "never logged in" cases
+        if code == LOGIN_NEVER:
+            if verbose:
+                print(f"  {user['email'].ljust(50)} Never logged in")
+            user["days_idle"] = "Never logged in"
+            idle_users.append(user)
+            checked.append({"id": user["id"], "last_auth_at": last_auth_at, "days_idle": None, "idle": True})
+            continue
+
+        if code == LOGIN_UNPARSEABLE:
+            if verbose:
+                print(
+                    f"  {user['email'].ljust(50)} Weird date format ('{last_auth_at}'), skipping."
+                )
+            continue
+
+        diff_days = round(days_idle[index], 1)
+        if verbose:
+            color = (
+                "\033[31m" if diff_days > days else "\033[32m"
+            )  # Red for idle, green for active
+            print(f"  {user['email'].ljust(50)} {color}{diff_days} days since login{reset}")
+
+        if diff_days > days:
+            user["days_idle"] = diff_days
+            idle_users.append(user)
+        checked.append({"id": user["id"], "last_auth_at": last_auth_at, "days_idle": diff_days, "idle": diff_days > days})
+    return idle_users, checked
+
+
 def print_boxed_summary(
     days: int, total_users: int, active_users: int, error: Optional[str] = None
 ) -> None:
@@ -206,19 +523,46 @@ def print_idle_users_table(idle_users: List[Dict[str, Any]]) -> None:
 
 def main() -> None:
     # Main logic: find idle users and report them
+    global auth_cache, op_limiter
+    parser = argparse.ArgumentParser(description="Find 1Password users who haven’t signed in for a while.")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Maximum number of concurrent `op user get` calls (default {DEFAULT_MAX_WORKERS}).")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help=f"File that caches each user’s last login between runs (default {DEFAULT_CACHE_PATH}).")
+    parser.add_argument("--days", type=int,
+                        help="Days since last login that makes someone idle. Asked for when omitted.")
+    parser.add_argument("--db",
+                        help="SQLite file that keeps each user’s last login and the results of every run. Replaces --cache.")
+    parser.add_argument("--query", choices=["idle", "newly-idle", "trend"],
+                        help="Answer from --db without calling 1Password: users idle more than --days, users newly idle in the latest run, or idle counts per run.")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL_HOURS,
+                        help=f"Hours a cached last login stays valid (default {DEFAULT_CACHE_TTL_HOURS:g}). Use 0 to always re-fetch.")
+    args = parser.parse_args()
+    # Build a fresh limiter for the ceiling rather than stretching the default one
+    op_limiter = AdaptiveLimiter(max(1, args.max_workers))
+    session.limiter = op_limiter
+    if args.query and not args.db:
+        parser.error("--query needs --db")
+    auth_cache = IdleHistory(args.db, args.cache_ttl) if args.db else AuthCache(args.cache, args.cache_ttl)
+    if args.query:
+        run_query(auth_cache, args.query, args.days)
+        return
+
     print("\n🚀 Let’s find those idle 1Password users...")
 
     # Ask how many days counts as idle
-    try:
-        days = int(input("\nHow many days since last login makes someone idle? "))
-    except ValueError:
-        print("  ⚠️  Please enter a valid number!")
-        return
+    days = args.days
+    if days is None:
+        try:
+            days = int(input("\nHow many days since last login makes someone idle? "))
+        except ValueError:
+            print("  ⚠️  Please enter a valid number!")
+            return
 
     # Step 1: Get the user list and summarize
     print("\n📋 Scanning users...")
     try:
-        users = parse_user_list_output()
+        users = list_users()
         total_users = len(users)
         active_users = len([u for u in users if u["state"] == "ACTIVE"])
         print_boxed_summary(days, total_users, active_users)
@@ -226,70 +570,21 @@ def main() -> None:
     except subprocess.CalledProcessError:
         print_boxed_summary(days, 0, 0, "Failed to fetch user list")
         return
+    if args.db:
+        auth_cache.sync_users(users)
 
     # Step 2: Fetch details for active users
-    active_users = get_active_users()
+    active_users = get_active_users(users, days)
     if not active_users:
         print("\n😕 No active users to check. Done!")
         return
 
     # Step 3: Find idle users
     print("\n🔎 Hunting for idle users...")
-    threshold_seconds = days * 86400
-    now = datetime.utcnow()
-    idle_users = []
+    idle_users, checked = find_idle_users(active_users, days, datetime.utcnow())
 
-    # Sort active users by days idle (descending) before processing
-    active_users.sort(
-        key=lambda x: (
-            float("inf")
-            if x.get("last_auth_at") in ["0001-01-01T00:00:00Z", "01/01/0001 00:00:00"]
-            else (
-                float("inf")
-                if not x.get("last_auth_at")
-                else (
-                    (now - parse_date(x["last_auth_at"])).total_seconds() / 86400
-                    if parse_date(x.get("last_auth_at"))
-                    else 0
-                )
-            )
-        ),
-        reverse=True,
-    )
-
-    for user in active_users:
-        last_auth_at = user.get("last_auth_at", "")
-        if not last_auth_at:
-            print(f"  {user['email'].ljust(50)} No login date, skipping.")
-            continue
-
-        # Handle "never logged in" cases
-        if last_auth_at in ["0001-01-01T00:00:00Z", "01/01/0001 00:00:00"]:
-            print(f"  {user['email'].ljust(50)} Never logged in")
-            user["days_idle"] = "Never logged in"
-            idle_users.append(user)
-            continue
-
-        # Parse the last login date
-        last_login = parse_date(last_auth_at)
-        if not last_login:
-            print(
-                f"  {user['email'].ljust(50)} Weird date format ('{last_auth_at}'), skipping."
-            )
-            continue
-
-        # Calculate days since last login
-        diff_seconds = (now - last_login).total_seconds()
-        diff_days = round(diff_seconds / 86400, 1)
-        color = (
-            "\033[31m" if diff_days > days else "\033[32m"
-        )  # Red for idle, green for active
-        reset = "\033[0m"
-        print(f"  {user['email'].ljust(50)} {color}{diff_days} days since login{reset}")
-
-        if diff_days > days:
-            user["days_idle"] = diff_days
-            idle_users.append(user)
+    if args.db:
+        auth_cache.record_run(days, checked)
 
     # Step 4: Save to CSV
     csv_path = os.path.abspath("user_list.csv")
@@ -0,0 +1,53 @@
+# Checks the last sign-in cache used by identify-absentees.py.
+import importlib.util
+import os
+import time
+from datetime import datetime, timedelta
+
+# The script has a hyphen in its name, so load it by path
+spec = importlib.util.spec_from_file_location(
+    "identify_absentees",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "identify-absentees.py"),
+)
+identify_absentees = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(identify_absentees)
+
+
+def cache_with_login(ttl_hours, days_ago):
+    cache = identify_absentees.AuthCache(None, ttl_hours)
+    last_login = (datetime.utcnow() - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    cache.entries["U1"] = {"last_auth_at": last_login, "fetched_at": time.time()}
+    return cache, last_login
+
+
+def test_fresh_entry_is_served():
+    cache, last_login = cache_with_login(24, 1)
+    assert cache.get("U1") == last_login
+
+
+def test_recent_login_is_served_after_expiry():
+    cache, last_login = cache_with_login(24, 1)
+    cache.entries["U1"]["fetched_at"] -= 48 * 3600
+    assert cache.get("U1", datetime.utcnow() - timedelta(days=90)) == last_login
+    assert cache.get("U1") is None
+
+
+def test_zero_ttl_always_looks_up():
+    cache, _ = cache_with_login(0, 1)
+    assert cache.get("U1") is None
+    assert cache.get("U1", datetime.utcnow() - timedelta(days=90)) is None
+
+
+def test_zero_ttl_fetches_user(monkeypatch):
+    cache, _ = cache_with_login(0, 1)
+    monkeypatch.setattr(identify_absentees, "auth_cache", cache)
+    fetched = []
+
+    def run_op_command(args):
+        fetched.append(args[2])
+        return {"last_auth_at": "2020-01-01T00:00:00Z"}
+
+    monkeypatch.setattr(identify_absentees, "run_op_command", run_op_command)
+    users = [{"id": "U1", "name": "User 1", "email": "u1@example.com", "state": "ACTIVE"}]
+    identify_absentees.get_active_users(users, 90)
+    assert fetched == ["U1"]